@@ -1,8 +1,21 @@
 
-from OpenGL.GL import *
-from OpenGL.GLU import *
-from OpenGL.GLUT import *
-import math, time, sys, random
+import math, time, sys, random, ctypes, os, struct, mmap, hashlib
+
+# --headless (or OBH_HEADLESS=1) runs the simulation with no window or GL context;
+# the OpenGL bindings are not imported at all, so it works on display-less servers.
+HEADLESS = '--headless' in sys.argv or os.environ.get('OBH_HEADLESS', '') not in ('', '0')
+if not HEADLESS:
+    from OpenGL.GL import *
+    from OpenGL.GLU import *
+    from OpenGL.GLUT import *
+import numpy as np
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+try: import fcntl             # POSIX advisory locks for the terrain disk cache
+except ImportError: fcntl = None
+try: import msvcrt            # Windows equivalent
+except ImportError: msvcrt = None
 
 # ---------------- Window ----------------
 WIN_W, WIN_H = 1280, 800
@@ -74,9 +87,18 @@ rudder_cmd = 0.0   # desired deflection (-RUDDER_MAX .. +RUDDER_MAX)
 rudder_deg = 0.0   # actual deflection following rudder_cmd
 
 keys_down = set()
-bullets   = []
 last_time = None
 
+# Player rounds, struct-of-arrays: rows [0, n) are in flight; a hit clears 'alive'
+# and update_bullets packs the survivors back to the front each frame.
+BULLET_POOL = 256   # starting capacity, doubles when full
+bullets = {'n': 0,
+           'p':  np.zeros((BULLET_POOL, 3)),
+           'p0': np.zeros((BULLET_POOL, 3)),      # position at the start of the current step
+           'v':  np.zeros((BULLET_POOL, 3)),
+           't0': np.zeros(BULLET_POOL),
+           'alive': np.zeros(BULLET_POOL, dtype=bool)}
+
 
 
 
@@ -284,6 +306,122 @@ bunkers = []      # {p(x,y), z_base, cluster_id}
 
 
 
+# --------- Spatial hash (uniform grid over x/y) ---------
+# Buckets entities by their x/y cell so proximity queries only visit nearby
+# cells. Queries return every object in the touched cells; callers still do
+# their own exact distance test. Entities are keyed by id(), so a dict has
+# to be grid_remove()d before it's dropped.
+SPATIAL_CELL = 1000.0
+
+def grid_new(cell=SPATIAL_CELL):
+    # cells: (i,j) -> {id: obj}, where: id -> (i,j); 'near' caches grid_mask_near's key table
+    return {'cell': cell, 'cells': {}, 'where': {}, 'near': None}
+
+def grid_clear(g):
+    g['cells'].clear(); g['where'].clear(); g['near'] = None
+
+def grid_insert(g, obj, x, y):
+    k = (math.floor(x / g['cell']), math.floor(y / g['cell']))
+    cell = g['cells'].get(k)
+    if cell is None:
+        cell = g['cells'][k] = {}; g['near'] = None
+    cell[id(obj)] = obj
+    g['where'][id(obj)] = k
+
+def grid_remove(g, obj):
+    k = g['where'].pop(id(obj), None)
+    if k is None: return
+    cell = g['cells'][k]
+    del cell[id(obj)]
+    if not cell:
+        del g['cells'][k]; g['near'] = None
+
+def grid_move(g, obj, x, y):
+    k = (math.floor(x / g['cell']), math.floor(y / g['cell']))
+    if g['where'].get(id(obj)) != k:
+        grid_remove(g, obj); grid_insert(g, obj, x, y)
+
+def grid_query_aabb(g, x0, y0, x1, y1):
+    c = g['cell']; cells = g['cells']
+    i0, i1 = math.floor(x0 / c), math.floor(x1 / c)
+    j0, j1 = math.floor(y0 / c), math.floor(y1 / c)
+    out = []
+    if (i1 - i0 + 1)*(j1 - j0 + 1) > len(cells):
+        # box covers more cells than are occupied: walk the occupied ones instead
+        for (i, j), cell in cells.items():
+            if i0 <= i <= i1 and j0 <= j <= j1: out.extend(cell.values())
+        return out
+    for i in range(i0, i1 + 1):
+        for j in range(j0, j1 + 1):
+            cell = cells.get((i, j))
+            if cell: out.extend(cell.values())
+    return out
+
+def grid_query_radius(g, x, y, r):
+    return grid_query_aabb(g, x - r, y - r, x + r, y + r)
+
+_GRID_KEY_W = 1 << 24   # packs (i, j) into one int64 for NumPy lookups
+
+def grid_mask_near(g, xs, ys):
+    """Vectorised broadphase: True where a point's cell or one of its 8 neighbours is
+       occupied, i.e. where a query of radius < cell could return anything."""
+    c = g['cell']
+    if g['near'] is None:
+        keys = [(i + di)*_GRID_KEY_W + (j + dj) for (i, j) in g['cells']
+                for di in (-1, 0, 1) for dj in (-1, 0, 1)]
+        g['near'] = np.unique(np.array(keys, dtype=np.int64))
+    near = g['near']
+    if not len(near): return np.zeros(np.shape(xs), dtype=bool)
+    ks = np.floor(np.asarray(xs) / c).astype(np.int64)*_GRID_KEY_W + np.floor(np.asarray(ys) / c).astype(np.int64)
+    i = np.minimum(np.searchsorted(near, ks), len(near) - 1)
+    return near[i] == ks
+
+air_grid    = grid_new()   # enemies
+ground_grid = grid_new()   # tower_aas, aa_units, sam_units, bunkers (tell apart by u['class'])
+
+# --- Entity registry: every live unit is in its list, its grid and its id index ---
+# Enemy ids and ground gids are separate counters, hence two indexes.
+_enemy_index  = {}   # enemy id -> enemy dict
+_ground_index = {}   # gid -> tower AA / AA / SAM / bunker dict
+_ground_gen   = 0    # bumped on every add/drop; packed ground buffers rebuild when it changes
+
+def _ground_add(lst, u):
+    global _ground_gen
+    lst.append(u)
+    grid_insert(ground_grid, u, u['p'][0], u['p'][1])
+    _ground_index[u['id']] = u
+    _ground_gen += 1
+    return u
+
+def _ground_drop(u):
+    # caller takes it out of its list
+    global _ground_gen
+    grid_remove(ground_grid, u)
+    _ground_index.pop(u['id'], None)
+    _ground_gen += 1
+
+def _ground_clear():
+    global _ground_gen
+    grid_clear(ground_grid); _ground_index.clear()
+    _ground_gen += 1
+
+def _enemy_add(e):
+    enemies.append(e)
+    grid_insert(air_grid, e, e['p'][0], e['p'][1])
+    _enemy_index[e['id']] = e
+
+def _enemy_drop(e):
+    grid_remove(air_grid, e)
+    _enemy_index.pop(e['id'], None)
+
+def _ground_aim_z(u):
+    # height ground units are hit/fused at (pods carry their own z)
+    if u['class'] == 'TAA':    return u['p'][2]
+    if u['class'] == 'BUNKER': return u['z'] + 12.0
+    return u['z']
+
+
+
 # --- Lock IDs for ground targets ---
 _ground_uid = 1
 def _new_gid():
@@ -292,11 +430,7 @@ def _new_gid():
     return gid
 
 def _ground_by_id(gid):
-    for lst in (tower_aas, aa_units, sam_units, bunkers):
-        for u in lst:
-            if u.get('id') == gid:
-                return u
-    return None
+    return _ground_index.get(gid)
 
 
 
@@ -338,6 +472,11 @@ MISSILES = {
     },
 }
 
+# colour per missile type (still friendly blue-ish but distinct): body tint and trail
+MISSILE_TRAIL_RGB = {'A2A_S': (0.35, 0.90, 1.00),   # bright cyan
+                     'A2A_M': (0.20, 0.70, 1.00)}   # deeper blue
+MISSILE_TRAIL_RGB_OTHER = (0.50, 0.85, 1.00)        # pale blue (A2S, SAM)
+
 MSL_AMMO = {'A2A_S': 50, 'A2A_M': 50, 'A2S_G': 50}
 MSL_SELECTED = 'A2A_S' # default selected missile type
 
@@ -375,7 +514,14 @@ _lock_state = 'NONE'     # NONE / ACQ / LOCK
 
 
 
-explosions = []  # active explosion FX
+EXPLOSION_POOL = 64   # starting capacity, doubles when full
+EXPLOSION_RGB = {'aircraft': (1.0, 0.6, 0.1), 'missile': (0.9, 0.95, 1.0), 'generic': (0.95, 0.8, 0.4)}
+explosions = {'n': 0,    # active explosion FX (struct of arrays, live rows packed at the front)
+              'p':   np.zeros((EXPLOSION_POOL, 3)),
+              't':   np.zeros(EXPLOSION_POOL),
+              'ttl': np.zeros(EXPLOSION_POOL),
+              'r0':  np.zeros(EXPLOSION_POOL),
+              'rgb': np.zeros((EXPLOSION_POOL, 3))}
 
 
 
@@ -405,7 +551,8 @@ aa_shots = []  # {'p':[x,y,z],'v':[vx,vy,vz],'t0':time,'life':AA_BULLET_LIFE}
 
 # --- Terrain shape controls (mountains + one smooth valley near spawn) ---
 TERRAIN_MOUNTAIN_GAIN = 1.0        # >1 = taller mountains
-VALLEY_SEED_TH  = random.random()*math.tau  # random valley direction
+VALLEY_HEADINGS = 16                         # valley direction is one of these (lets the disk cache hit)
+VALLEY_SEED_TH  = random.randrange(VALLEY_HEADINGS)*math.tau/VALLEY_HEADINGS  # random valley direction
 VALLEY_CENTER   = (0.0, 0.0)                 # through spawn for now
 VALLEY_LEN      = 30_000.0                   # half-length along axis (~30 km each way)
 VALLEY_WIDTH    = 2_500.0                    # lateral 1-sigma (~2.5 km)
@@ -462,14 +609,78 @@ def _spawn_sam_from(x,y,z):
     })
 
 
+# --- LOS scheduling for ground weapons (tower AA, scattered AA, SAMs) ---
+# In-range sites get their terrain LOS re-checked in priority order (close,
+# dangerous, long unchecked first) until the budget is spent; the rest keep the
+# verdict in u['los'] from an earlier step. Sites start blind.
+# The interactive loop shares one wall-clock budget across all sim steps of a
+# rendered frame (sim_advance arms it); sim_run/headless uses a fixed check
+# count per step instead so runs are reproducible.
+LOS_BUDGET_US       = 1500.0                          # per rendered frame
+LOS_MIN_CHECKS      = 2                               # per frame, progress even when over budget
+LOS_CHECKS_PER_STEP = 8                               # fixed quota when no frame budget is armed
+LOS_THREAT          = {'SAM': 0.5, 'TAA': 0.8, 'AA': 1.0}  # distance multiplier, lower goes first
+_los_frame = {'t_end': None, 'done': 0}              # armed by sim_advance for one frame
+
+_los_in_range = {}                                  # id -> unit scheduled last step
+LOS_QUERY_R = max(AA_RANGE_H, SAM_RANGE, TOWER_AA_RANGE + TOWER_R)  # pods sit on the tower rim
+
+def update_ground_los():
+    global _los_in_range
+    jobs = []   # (priority, unit, eye, clearance, class)
+    in_range = {}
+    def _job(u, eye, clr, cls, d):
+        if 'los' not in u:
+            u['los'] = False; u['los_age'] = 0
+            prio = -1.0                                   # just came into range: check first
+        else:
+            prio = d * LOS_THREAT[cls] / (1.0 + u['los_age'])
+        jobs.append((prio, u, eye, clr, cls))
+        in_range[u['id']] = u
+
+    for u in grid_query_radius(ground_grid, pos[0], pos[1], LOS_QUERY_R):
+        cls = u['class']
+        if cls == 'TAA':
+            t = towers[u['tower_idx']]
+            d = math.hypot(pos[0]-t['p'][0], pos[1]-t['p'][1])
+            if t['faction']==FACTION_FOE and TOWER_NOFIRE_R <= d <= TOWER_AA_RANGE:
+                _job(u, [u['p'][0],u['p'][1],u['p'][2]], 28.0, 'TAA', d)
+        elif cls == 'AA':
+            d = math.hypot(pos[0]-u['p'][0], pos[1]-u['p'][1])
+            if d <= AA_RANGE_H: _job(u, [u['p'][0],u['p'][1],u['z']], 28.0, 'AA', d)
+        elif cls == 'SAM':
+            d = math.hypot(pos[0]-u['p'][0], pos[1]-u['p'][1])
+            # Slightly looser clearance helps in valleys; keeps terrain masking meaningful
+            if d <= SAM_RANGE: _job(u, [u['p'][0],u['p'][1],u['z'] + 40.0], 22.0, 'SAM', d)
+    # sites that left range since last step forget their verdict
+    for i, u in _los_in_range.items():
+        if i not in in_range:
+            u.pop('los', None); u.pop('los_age', None)
+    _los_in_range = in_range
+    if not jobs: return
+
+    jobs.sort(key=lambda j: j[0])
+    player = [pos[0],pos[1],pos[2]]
+    t_end = _los_frame['t_end']
+    for n, (_, u, eye, clr, cls) in enumerate(jobs):
+        if t_end is None:
+            spent = n >= LOS_CHECKS_PER_STEP
+        else:
+            spent = _los_frame['done'] >= LOS_MIN_CHECKS and time.perf_counter() > t_end
+        if spent:
+            for j in jobs[n:]: j[1]['los_age'] += 1
+            break
+        u['los'] = has_line_of_sight(eye, player, clearance=clr, key=(cls, u['id']))
+        u['los_age'] = 0
+        _los_frame['done'] += 1
+
+
 # --- SAM logic (loaded/aiming + fire on cooldown) ---
 def update_sams(dt):
     for s in sam_units:
-        # range + LOS gate
+        # range + LOS gate (LOS refreshed by update_ground_los)
         in_range = (math.hypot(pos[0]-s['p'][0], pos[1]-s['p'][1]) <= SAM_RANGE)
-        eye_sam  = [s['p'][0], s['p'][1], s['z'] + 40.0]
-            # Slightly looser clearance helps in valleys; keeps terrain masking meaningful
-        s['aiming'] = in_range and has_line_of_sight(eye_sam, [pos[0],pos[1],pos[2]], clearance=22.0)
+        s['aiming'] = in_range and s.get('los', False)
 
 
 
@@ -496,14 +707,14 @@ def update_sams(dt):
 def _spawn_aa_bullet(x,y,z):
     to = _norm3([pos[0]-x, pos[1]-y, pos[2]-z])
     aa_shots.append({'p':[x,y,z], 'v':[to[0]*AA_BULLET_SPD, to[1]*AA_BULLET_SPD, to[2]*AA_BULLET_SPD],
-                     't0': time.time(), 'life': AA_BULLET_LIFE})
+                     't0': sim_time, 'life': AA_BULLET_LIFE})
 
 def update_aa_shots(dt):
     if not aa_shots: return
     keep=[]
     for s in aa_shots:
         s['p'][0]+=s['v'][0]*dt; s['p'][1]+=s['v'][1]*dt; s['p'][2]+=s['v'][2]*dt
-        alive = (time.time()-s['t0']) < s['life']
+        alive = (sim_time-s['t0']) < s['life']
         # hit player?
         if not PLAYER_INVINCIBLE:
             dx= s['p'][0]-pos[0]; dy=s['p'][1]-pos[1]; dz=s['p'][2]-pos[2]
@@ -535,7 +746,7 @@ def update_ground_weapons(dt):
         dist = math.hypot(pos[0]-t['p'][0], pos[1]-t['p'][1])
         if t['faction']==FACTION_FOE and dist >= TOWER_NOFIRE_R and dist <= TOWER_AA_RANGE:
             # LOS from AA pod to player
-            if has_line_of_sight([a['p'][0],a['p'][1],a['p'][2]], [pos[0],pos[1],pos[2]], clearance=28.0):
+            if a.get('los', False):
                 a['cool'] = a.get('cool',0.0) - dt
                 if a['cool'] <= 0.0:
                     _spawn_aa_bullet(a['p'][0], a['p'][1], a['p'][2])
@@ -545,7 +756,7 @@ def update_ground_weapons(dt):
     for u in aa_units:
         d = math.hypot(pos[0]-u['p'][0], pos[1]-u['p'][1])
         if d <= AA_RANGE_H:
-            if has_line_of_sight([u['p'][0],u['p'][1],u['z']], [pos[0],pos[1],pos[2]], clearance=28.0):
+            if u.get('los', False):
                 u['cool'] = u.get('cool',0.0) - dt
                 if u['cool'] <= 0.0:
                     _spawn_aa_bullet(u['p'][0], u['p'][1], u['z'])
@@ -569,47 +780,58 @@ def update_ground_weapons(dt):
 
 
 
-# Shared helper primitives (all axes in local model space; nose points +X)
-def _draw_box(hx, hy, hz, rgb=(0.6,0.6,0.6)):
-    glColor3f(*rgb)
+# Shared helper primitives (all axes in local model space; nose points +X).
+# Each shape is generated once as a flat triangle list; the _draw_* helpers send it in
+# immediate mode and the enemy builders bake it into one static mesh per type.
+def _strip_tris(vs):
+    # GL_TRIANGLE_STRIP order, odd triangles flipped to keep one winding
+    return [(vs[i], vs[i+1], vs[i+2]) if i % 2 == 0 else (vs[i+1], vs[i], vs[i+2])
+            for i in range(len(vs) - 2)]
+
+def _fan_tris(c, vs):
+    return [(c, vs[i], vs[i+1]) for i in range(len(vs) - 1)]
+
+def _ring_x(x, radius, slices, reverse=False):
+    r = range(slices, -1, -1) if reverse else range(slices + 1)
+    return [(x, radius*math.cos(2.0*math.pi*i/slices), radius*math.sin(2.0*math.pi*i/slices)) for i in r]
+
+def _box_tris(hx, hy, hz):
     # vertices centered at origin
     x0,x1 = -hx, hx; y0,y1 = -hy, hy; z0,z1 = -hz, hz
-    glBegin(GL_QUADS)
-    # +X / -X
-    glVertex3f(x1,y0,z0); glVertex3f(x1,y1,z0); glVertex3f(x1,y1,z1); glVertex3f(x1,y0,z1)
-    glVertex3f(x0,y0,z1); glVertex3f(x0,y1,z1); glVertex3f(x0,y1,z0); glVertex3f(x0,y0,z0)
-    # +Y / -Y
-    glVertex3f(x0,y1,z0); glVertex3f(x1,y1,z0); glVertex3f(x1,y1,z1); glVertex3f(x0,y1,z1)
-    glVertex3f(x0,y0,z1); glVertex3f(x1,y0,z1); glVertex3f(x1,y0,z0); glVertex3f(x0,y0,z0)
-    # +Z / -Z
-    glVertex3f(x0,y0,z1); glVertex3f(x1,y0,z1); glVertex3f(x1,y1,z1); glVertex3f(x0,y1,z1)
-    glVertex3f(x0,y1,z0); glVertex3f(x1,y1,z0); glVertex3f(x0,y0,z0); glVertex3f(x0,y0,z0)
-    glEnd()
-
-def _draw_cylinder_x(length, radius, slices=14, rgb=(0.65,0.65,0.67)):
-    glColor3f(*rgb)
+    quads = [((x1,y0,z0), (x1,y1,z0), (x1,y1,z1), (x1,y0,z1)),   # +X / -X
+             ((x0,y0,z1), (x0,y1,z1), (x0,y1,z0), (x0,y0,z0)),
+             ((x0,y1,z0), (x1,y1,z0), (x1,y1,z1), (x0,y1,z1)),   # +Y / -Y
+             ((x0,y0,z1), (x1,y0,z1), (x1,y0,z0), (x0,y0,z0)),
+             ((x0,y0,z1), (x1,y0,z1), (x1,y1,z1), (x0,y1,z1)),   # +Z / -Z
+             ((x0,y1,z0), (x1,y1,z0), (x0,y0,z0), (x0,y0,z0))]
+    return [t for a,b,c,d in quads for t in ((a,b,c), (a,c,d))]
+
+def _cylinder_x_tris(length, radius, slices=14):
     x0 = -length*0.5; x1 = +length*0.5
-    glBegin(GL_TRIANGLE_STRIP)
-    for i in range(slices+1):
-        th = 2.0*math.pi*i/slices
-        c,s = math.cos(th), math.sin(th)
-        glVertex3f(x0, radius*c, radius*s)
-        glVertex3f(x1, radius*c, radius*s)
-    glEnd()
+    side = []
+    for v0, v1 in zip(_ring_x(x0, radius, slices), _ring_x(x1, radius, slices)):
+        side += [v0, v1]
     # caps
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(x0,0,0)
-    for i in range(slices+1):
-        th = 2.0*math.pi*i/slices
-        glVertex3f(x0, radius*math.cos(th), radius*math.sin(th))
-    glEnd()
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(x1,0,0)
-    for i in range(slices,-1,-1):
-        th = 2.0*math.pi*i/slices
-        glVertex3f(x1, radius*math.cos(th), radius*math.sin(th))
+    return (_strip_tris(side) + _fan_tris((x0,0,0), _ring_x(x0, radius, slices))
+            + _fan_tris((x1,0,0), _ring_x(x1, radius, slices, reverse=True)))
+
+def _cone_x_tris(length, radius, slices=14):
+    base = -length*0.5; tip = +length*0.5
+    ring = _ring_x(base, radius, slices)
+    return _fan_tris((tip,0,0), ring) + _fan_tris((base,0,0), ring)   # side + base cap
+
+def _draw_flat_tris(pts, rgb=(0.6,0.6,0.6)):
+    glColor3f(*rgb); glBegin(GL_TRIANGLES)
+    for a,b,c in pts:
+        glVertex3f(*a); glVertex3f(*b); glVertex3f(*c)
     glEnd()
 
+def _draw_box(hx, hy, hz, rgb=(0.6,0.6,0.6)):
+    _draw_flat_tris(_box_tris(hx, hy, hz), rgb)
+
+def _draw_cylinder_x(length, radius, slices=14, rgb=(0.65,0.65,0.67)):
+    _draw_flat_tris(_cylinder_x_tris(length, radius, slices), rgb)
+
 def _draw_cylinder_z(height, radius, slices=16, rgb=(0.6,0.6,0.6)):
     """Vertical cylinder (along +Z), base at z=0, height up by `height`."""
     glPushMatrix()
@@ -618,78 +840,61 @@ def _draw_cylinder_z(height, radius, slices=16, rgb=(0.6,0.6,0.6)):
     _draw_cylinder_x(height, radius, slices=slices, rgb=rgb)
     glPopMatrix()
 
-
-
 def _draw_cone_x(length, radius, slices=14, rgb=(0.7,0.7,0.72)):
-    glColor3f(*rgb)
-    base = -length*0.5; tip = +length*0.5
-    # side
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(tip,0,0)
-    for i in range(slices+1):
-        th = 2.0*math.pi*i/slices
-        glVertex3f(base, radius*math.cos(th), radius*math.sin(th))
-    glEnd()
-    # base cap
-    glBegin(GL_TRIANGLE_FAN)
-    glVertex3f(base,0,0)
-    for i in range(slices+1):
-        th = 2.0*math.pi*i/slices
-        glVertex3f(base, radius*math.cos(th), radius*math.sin(th))
-    glEnd()
+    _draw_flat_tris(_cone_x_tris(length, radius, slices), rgb)
 
-def _draw_flat_tris(pts, rgb=(0.6,0.6,0.6)):
-    glColor3f(*rgb); glBegin(GL_TRIANGLES)
-    for a,b,c in pts:
-        glVertex3f(*a); glVertex3f(*b); glVertex3f(*c)
-    glEnd()
+def _mesh_add(m, tris, rgb, at=(0.0, 0.0, 0.0)):
+    """Append triangles (offset by `at`) to mesh rows [x,y,z,r,g,b]."""
+    ox, oy, oz = at
+    for tri in tris:
+        for x, y, z in tri:
+            m.append((x+ox, y+oy, z+oz, rgb[0], rgb[1], rgb[2]))
 
 # --- Enemy model builders (extremely low poly; canonical sizes feed hit radii) ---
-def build_enemy_A10(pal):
+def build_enemy_A10(m, pal):
     fus_L, fus_R = 120, 14
     wing_span, wing_chord = 120, 18
     tail_span, tail_chord = 70, 12
     eng_R, eng_L = 10, 30
-    _draw_cylinder_x(fus_L, fus_R, rgb=pal['fus'])
-    glPushMatrix(); glTranslatef(+fus_L*0.5,0,0); _draw_cone_x(26, fus_R*0.95, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-10, 0, 0); _draw_box(wing_chord*0.5, wing_span*0.5, 1.5, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(+fus_L*0.10, +fus_R*1.8, +fus_R*0.6); _draw_cylinder_x(eng_L*0.8, eng_R*0.8, rgb=pal['accent']); glPopMatrix()
-    glPushMatrix(); glTranslatef(+fus_L*0.10, -fus_R*1.8, +fus_R*0.6); _draw_cylinder_x(eng_L*0.8, eng_R*0.8, rgb=pal['accent']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-fus_L*0.35, +fus_R*1.9, 0); _draw_box(tail_chord*0.5, 4, 6, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-fus_L*0.35, -fus_R*1.9, 0); _draw_box(tail_chord*0.5, 4, 6, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-fus_L*0.50, 0, 6); _draw_box(6, tail_span*0.55, 1.2, rgb=pal['wing']); glPopMatrix()
-
-def build_enemy_MiG21(pal):
+    _mesh_add(m, _cylinder_x_tris(fus_L, fus_R), pal['fus'])
+    _mesh_add(m, _cone_x_tris(26, fus_R*0.95), pal['wing'], at=(+fus_L*0.5, 0, 0))
+    _mesh_add(m, _box_tris(wing_chord*0.5, wing_span*0.5, 1.5), pal['wing'], at=(-10, 0, 0))
+    _mesh_add(m, _cylinder_x_tris(eng_L*0.8, eng_R*0.8), pal['accent'], at=(+fus_L*0.10, +fus_R*1.8, +fus_R*0.6))
+    _mesh_add(m, _cylinder_x_tris(eng_L*0.8, eng_R*0.8), pal['accent'], at=(+fus_L*0.10, -fus_R*1.8, +fus_R*0.6))
+    _mesh_add(m, _box_tris(tail_chord*0.5, 4, 6), pal['wing'], at=(-fus_L*0.35, +fus_R*1.9, 0))
+    _mesh_add(m, _box_tris(tail_chord*0.5, 4, 6), pal['wing'], at=(-fus_L*0.35, -fus_R*1.9, 0))
+    _mesh_add(m, _box_tris(6, tail_span*0.55, 1.2), pal['wing'], at=(-fus_L*0.50, 0, 6))
+
+def build_enemy_MiG21(m, pal):
     fus_L, fus_R = 130, 10
-    _draw_cylinder_x(fus_L, fus_R, rgb=pal['fus'])
-    glPushMatrix(); glTranslatef(+fus_L*0.5,0,0); _draw_cone_x(36, fus_R*1.05, rgb=pal['accent']); glPopMatrix()
+    _mesh_add(m, _cylinder_x_tris(fus_L, fus_R), pal['fus'])
+    _mesh_add(m, _cone_x_tris(36, fus_R*1.05), pal['accent'], at=(+fus_L*0.5, 0, 0))
     span = 90
     tris = [((-10, -span*0.5, 0), (30, 0, 0), (-10,  span*0.5, 0)),
             ((-20, -span*0.3, 0), ( -5, 0, 0), (-20,  span*0.3, 0))]
-    _draw_flat_tris(tris, rgb=pal['wing'])
-    glPushMatrix(); glTranslatef(-40,0,0); _draw_box(10, 1.5, 10, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-35, +20, 0); _draw_box(8, 18, 1.0, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-35, -20, 0); _draw_box(8, 18, 1.0, rgb=pal['wing']); glPopMatrix()
+    _mesh_add(m, tris, pal['wing'])
+    _mesh_add(m, _box_tris(10, 1.5, 10), pal['wing'], at=(-40, 0, 0))
+    _mesh_add(m, _box_tris(8, 18, 1.0), pal['wing'], at=(-35, +20, 0))
+    _mesh_add(m, _box_tris(8, 18, 1.0), pal['wing'], at=(-35, -20, 0))
 
-def build_enemy_F16(pal):
+def build_enemy_F16(m, pal):
     fus_L, fus_R = 140, 12
-    _draw_cylinder_x(fus_L, fus_R, rgb=pal['fus'])
-    glPushMatrix(); glTranslatef(+fus_L*0.5,0,0); _draw_cone_x(34, fus_R*1.0, rgb=pal['accent']); glPopMatrix()
-    glPushMatrix(); glTranslatef(+10, 0, -fus_R*1.3); _draw_box(10, 12, 6, rgb=pal['accent'])
-    glPopMatrix()
-    glPushMatrix(); glTranslatef(-10,0,0); _draw_box(18, 85, 1.5, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-45,0,0); _draw_box(10, 2.0, 12, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-40, +22, 0); _draw_box(8, 20, 1.2, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-40, -22, 0); _draw_box(8, 20, 1.2, rgb=pal['wing']); glPopMatrix()
-
-def build_enemy_Rafale(pal):
+    _mesh_add(m, _cylinder_x_tris(fus_L, fus_R), pal['fus'])
+    _mesh_add(m, _cone_x_tris(34, fus_R*1.0), pal['accent'], at=(+fus_L*0.5, 0, 0))
+    _mesh_add(m, _box_tris(10, 12, 6), pal['accent'], at=(+10, 0, -fus_R*1.3))
+    _mesh_add(m, _box_tris(18, 85, 1.5), pal['wing'], at=(-10, 0, 0))
+    _mesh_add(m, _box_tris(10, 2.0, 12), pal['wing'], at=(-45, 0, 0))
+    _mesh_add(m, _box_tris(8, 20, 1.2), pal['wing'], at=(-40, +22, 0))
+    _mesh_add(m, _box_tris(8, 20, 1.2), pal['wing'], at=(-40, -22, 0))
+
+def build_enemy_Rafale(m, pal):
     fus_L, fus_R = 145, 12
-    _draw_cylinder_x(fus_L, fus_R, rgb=pal['fus'])
-    glPushMatrix(); glTranslatef(+fus_L*0.5,0,0); _draw_cone_x(32, fus_R*1.05, rgb=pal['accent']); glPopMatrix()
-    glPushMatrix(); glTranslatef(+15, +28, 0); _draw_box(6, 20, 1.0, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(+15, -28, 0); _draw_box(6, 20, 1.0, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-5, 0, 0); _draw_box(20, 90, 1.5, rgb=pal['wing']); glPopMatrix()
-    glPushMatrix(); glTranslatef(-55,0,0); _draw_box(10, 2.0, 13, rgb=pal['wing']); glPopMatrix()
+    _mesh_add(m, _cylinder_x_tris(fus_L, fus_R), pal['fus'])
+    _mesh_add(m, _cone_x_tris(32, fus_R*1.05), pal['accent'], at=(+fus_L*0.5, 0, 0))
+    _mesh_add(m, _box_tris(6, 20, 1.0), pal['wing'], at=(+15, +28, 0))
+    _mesh_add(m, _box_tris(6, 20, 1.0), pal['wing'], at=(+15, -28, 0))
+    _mesh_add(m, _box_tris(20, 90, 1.5), pal['wing'], at=(-5, 0, 0))
+    _mesh_add(m, _box_tris(10, 2.0, 13), pal['wing'], at=(-55, 0, 0))
 
 # Map type -> builder & color accents if needed later
 ENEMY_BUILDERS = {
@@ -736,7 +941,7 @@ def _spawn_enemy_ahead():
         'type': t, 'name': TYPE_META[t]['name'],
         'p': spawn_p[:], 'yaw': yaw, 'pitch': 0.0, 'roll': 0.0,
         'speed': spd, 'pattern': pattern,
-        't0': time.time(), 'phase': random.random()*math.tau,
+        't0': sim_time, 'phase': random.random()*math.tau,
         'hit_r': hit_r, 'scale': scale,
     }
 
@@ -750,6 +955,7 @@ TYPE_META = {
     'F16'    : {'name':'F-16',            'scale':0.90, 'colors':{'fus':(0.64,0.68,0.72), 'wing':(0.66,0.70,0.74), 'accent':(0.85,0.10,0.10)}},
     'Rafale' : {'name':'Rafale',          'scale':0.95, 'colors':{'fus':(0.60,0.66,0.72), 'wing':(0.62,0.68,0.74), 'accent':(0.10,0.45,0.85)}},
 }
+ENEMY_HIT_R_MAX = max(BASE_HIT_R[t] * TYPE_META[t]['scale'] for t in BASE_HIT_R)   # grid query reach
 
 
 
@@ -763,8 +969,7 @@ def _assign_enemy_id(e):
 
 
 def spawn_enemy():
-    e = _assign_enemy_id(_spawn_enemy_ahead())
-    enemies.append(e)
+    _enemy_add(_assign_enemy_id(_spawn_enemy_ahead()))
 
 
 # For poisson-like spawn timing
@@ -781,45 +986,123 @@ def _dir_from_yaw(yaw):
     cy, sy = math.cos(deg2rad(yaw)), math.sin(deg2rad(yaw))
     return (cy, sy, 0.0)
 
-def _bullet_hits_enemy(b, e):
-    # Simple sphere bound (later: replace with AABB/OBB)
-    dx = b['p'][0]-e['p'][0]; dy = b['p'][1]-e['p'][1]; dz = b['p'][2]-e['p'][2]
-    return (dx*dx + dy*dy + dz*dz) <= (e['hit_r']*e['hit_r'])
-
-def _bullet_hit_any_ground(b):
-    px,py,pz = b['p']
-    # tower body: cylinder test (2D)
-    for i,t in enumerate(towers):
-        dx = px - t['p'][0]; dy = py - t['p'][1]
-        if (dx*dx+dy*dy) <= (t['r']+8.0)**2 and pz <= (t['h']+GROUND_PLANE_Z+30.0):
-            mark_tower_hit(i, by_player=True); return True
-
-    # tower AA / scattered AA / SAM / bunkers: small sphere / box-ish check
-    def near2(p, u, z, r):
-        return ( (p[0]-u['p'][0])**2 + (p[1]-u['p'][1])**2 + (z - z)**2 ) <= r*r
-    for u in tower_aas:
-        if ( (px-u['p'][0])**2 + (py-u['p'][1])**2 + (pz-u['p'][2])**2 ) <= (40.0**2):
-            u['hp'] = u.get('hp',100) - BULLET_DAMAGE; return True
-    for u in aa_units:
-        if ( (px-u['p'][0])**2 + (py-u['p'][1])**2 + (pz-u['z'])**2 ) <= (38.0**2):
-            u['hp'] = u.get('hp',100) - BULLET_DAMAGE; return True
-    for u in sam_units:
-        if ( (px-u['p'][0])**2 + (py-u['p'][1])**2 + (pz-u['z'])**2 ) <= (45.0**2):
-            u['hp'] = u.get('hp',160) - BULLET_DAMAGE; return True
-    for u in bunkers:
-        if ( (px-u['p'][0])**2 + (py-u['p'][1])**2 + (pz-(u['z']+12.0))**2 ) <= (60.0**2):
-            u['hp'] = u.get('hp',220) - BULLET_DAMAGE; return True
-    return False
+# --------- Bullet sweeps (segment vs sphere, batched) ---------
+# Rounds cover BULLET_SPEED*dt per step (50 u at 60 Hz, more on slow frames), so
+# hits are tested along the segment each round swept this step, not at its end
+# point. A grid broadphase picks the rounds and targets worth testing, then one
+# NumPy pass solves every candidate pair.
+GROUND_BULLET_R = {'TAA': (40.0, 100), 'AA': (38.0, 100), 'SAM': (45.0, 160), 'BUNKER': (60.0, 220)}  # hit radius, default hp
+GROUND_BULLET_R_MAX = max(r for r, _ in GROUND_BULLET_R.values())
+
+def _sweep_t(f, D, R):
+    """Entry time t in [0,1] of the point f + t*D (offsets from sphere centres, last axis
+       xyz, broadcasting) into spheres of radius R; inf where it never gets inside."""
+    a = (D*D).sum(-1)
+    b = (f*D).sum(-1)
+    c = (f*f).sum(-1) - R*R
+    moving = a > 1e-12
+    a1 = np.where(moving, a, 1.0)
+    disc = b*b - a*c
+    sq = np.sqrt(np.maximum(disc, 0.0))
+    t_in = (-b - sq) / a1; t_out = (-b + sq) / a1
+    hit = np.where(moving, (disc >= 0.0) & (t_out >= 0.0) & (t_in <= 1.0), c <= 0.0)
+    return np.where(hit, np.maximum(t_in, 0.0), np.inf)
+
+def _sweep_candidates(g, A, D, rows, reach):
+    """Broadphase: rows whose swept segment can come within reach of something in
+       grid g, and the (deduplicated) objects near them."""
+    if not len(rows): return rows, []
+    mid = A[rows] + 0.5*D[rows]
+    half = 0.5*np.hypot(D[rows, 0], D[rows, 1])
+    if half.max() + reach < g['cell']:
+        near = grid_mask_near(g, mid[:, 0], mid[:, 1])
+        rows, mid, half = rows[near], mid[near], half[near]
+    found = {}
+    for (x, y), h in zip(mid[:, :2].tolist(), half.tolist()):
+        for o in grid_query_radius(g, x, y, h + reach):
+            found[id(o)] = o
+    return rows, list(found.values())
+
+def _first_hits(T):
+    # per row: column of the earliest hit (or -1)
+    j = T.argmin(1)
+    return np.where(np.isfinite(T[np.arange(len(T)), j]), j, -1)
+
+def _bullet_sweep_ground(A, D, rows):
+    """Retire-and-damage pass for rounds (rows) sweeping A -> A+D against towers and
+       ground units. Returns the rows that hit something."""
+    if not len(rows): return rows
+    hit_rows = []
+    # tower body: vertical cylinder, tested where the segment passes closest to the axis (2D)
+    if towers:
+        TP = np.array([t['p'] for t in towers], dtype=np.float64)
+        TR = np.array([t['r'] + 8.0 for t in towers])
+        TZ = np.array([t['h'] + GROUND_PLANE_Z + 30.0 for t in towers])
+        f  = A[rows, None, :2] - TP[None, :, :]
+        d2 = D[rows, :2]
+        aa = np.maximum(np.einsum('ij,ij->i', d2, d2), 1e-12)[:, None]
+        t  = np.clip(-np.einsum('kmj,kj->km', f, d2) / aa, 0.0, 1.0)
+        cx = f + t[..., None]*d2[:, None, :]
+        z  = A[rows, 2][:, None] + t*D[rows, 2][:, None]
+        T  = np.where((np.einsum('kmj,kmj->km', cx, cx) <= TR*TR) & (z <= TZ), t, np.inf)
+        for r, j in zip(rows.tolist(), _first_hits(T).tolist()):
+            if j >= 0:
+                mark_tower_hit(j, by_player=True); hit_rows.append(r)
+        if hit_rows: rows = np.setdiff1d(rows, hit_rows)
+
+    # tower AA / scattered AA / SAM / bunkers: small spheres
+    rows, units = _sweep_candidates(ground_grid, A, D, rows, GROUND_BULLET_R_MAX)
+    if units:
+        C = np.array([[u['p'][0], u['p'][1], _ground_aim_z(u)] for u in units])
+        R = np.array([GROUND_BULLET_R[u['class']][0] for u in units])
+        T = _sweep_t(A[rows][:, None, :] - C[None, :, :], D[rows][:, None, :], R[None, :])
+        for r, j in zip(rows.tolist(), _first_hits(T).tolist()):
+            if j >= 0:
+                u = units[j]
+                u['hp'] = u.get('hp', GROUND_BULLET_R[u['class']][1]) - BULLET_DAMAGE
+                hit_rows.append(r)
+    return np.array(hit_rows, dtype=np.int64)
+
+def _bullet_sweep_enemies(prev):
+    """Live rounds vs enemies, in each enemy's frame (prev: enemy positions before this
+       step) so crossing paths register too. Applies damage; returns the hit count."""
+    global score
+    n = bullets['n']
+    if not n or not enemies: return 0
+    rows = np.flatnonzero(bullets['alive'][:n])
+    A = bullets['p0'][:n]; D = bullets['p'][:n] - A
+    E1 = np.array([e['p'] for e in enemies], dtype=np.float64)
+    E0 = np.array(prev, dtype=np.float64)
+    step = float(np.sqrt(((E1 - E0)**2).sum(1)).max())
+    rows, near = _sweep_candidates(air_grid, A, D, rows, ENEMY_HIT_R_MAX + step)
+    if not near: return 0
+    idx = {id(e): i for i, e in enumerate(enemies)}
+    cols = [idx[id(e)] for e in near]
+    # relative motion: round start vs enemy start, displacement minus enemy displacement
+    R = np.array([e['hit_r'] for e in near])
+    T = _sweep_t(A[rows][:, None, :] - E0[cols][None, :, :],
+                 D[rows][:, None, :] - (E1 - E0)[cols][None, :, :], R[None, :])
+    hits = 0
+    for r, j in zip(rows.tolist(), _first_hits(T).tolist()):
+        if j >= 0:
+            e = near[j]
+            e['hp'] = e.get('hp', 120) - BULLET_DAMAGE
+            score += 1                      # +1 per hit
+            bullets['alive'][r] = False     # one bullet, one hit
+            hits += 1
+    return hits
 
 
 
 
 
 def update_enemies(dt):
-    global score
     _maybe_spawn(dt)
     if not enemies: return
     keep = []
+
+    # pass 1: movement
+    prev = [e['p'][:] for e in enemies]
     for e in enemies:
         # ensure HP fields exist
         if 'hp' not in e:
@@ -833,7 +1116,7 @@ def update_enemies(dt):
         e['p'][1] += fy * e['speed'] * dt
 
         # pattern
-        t = time.time() - e['t0']
+        t = sim_time - e['t0']
         if e['pattern'] == 'zigzag':
             amp = 220.0; freq = 0.5
             rx, ry = +fy, -fx
@@ -844,13 +1127,19 @@ def update_enemies(dt):
         e['p'][2] = clamp(e['p'][2] + math.sin((t+e['phase'])*0.7) * 12.0 * dt, ENEMY_MIN_ALT, ENEMY_MAX_ALT)
         e['p'][2] = clamp(e['p'][2], PLAYER_ALT_MIN + 5.0, ENEMY_MAX_ALT)
 
+    # hard floor over actual terrain so enemies never dip into mountains (one batched lookup)
+    min_clear = 120.0
+    terr = terrain_h_many([e['p'][0] for e in enemies], [e['p'][1] for e in enemies]).tolist()
+    for e, tz in zip(enemies, terr):
+        if e['p'][2] < tz + min_clear:
+            e['p'][2] = tz + min_clear
+        grid_move(air_grid, e, e['p'][0], e['p'][1])
 
-        # hard floor over actual terrain so enemies never dip into mountains
-        terr = terrain_h(e['p'][0], e['p'][1])
-        min_clear = 120.0
-        if e['p'][2] < terr + min_clear:
-            e['p'][2] = terr + min_clear
+    # bullet hits along this step's paths (damage only; pass 2 handles kills)
+    _bullet_sweep_enemies(prev)
 
+    # pass 2: collisions, culling, damage
+    for e in enemies:
         # tower cylinder collision → treat as crash
         ti = _hit_tower_cylinder(e['p'])
         if ti >= 0:
@@ -890,15 +1179,6 @@ def update_enemies(dt):
         if abs(x) > GROUND_EXTENT*1.05 or abs(y) > GROUND_EXTENT*1.05:
             continue
 
-        # bullet collisions -> apply damage (no insta-kill)
-        if bullets:
-            for b in bullets:
-                if _bullet_hits_enemy(b, e):
-                    e['hp'] -= BULLET_DAMAGE
-                    score += 1                 # +1 per hit
-                    b['t0'] = 0.0              # retire bullet
-                    break                       # one bullet, one hit
-
         if e['hp'] > 0:
             keep.append(e)
         else:
@@ -907,6 +1187,10 @@ def update_enemies(dt):
 
           
 
+    if len(keep) != len(enemies):
+        kept = set(map(id, keep))
+        for e in enemies:
+            if id(e) not in kept: _enemy_drop(e)
     enemies[:] = keep
 
 def _push_at(p, yaw, pitch=0.0, roll=0.0):
@@ -914,8 +1198,73 @@ def _push_at(p, yaw, pitch=0.0, roll=0.0):
     glTranslatef(p[0], p[1], p[2])
     glRotatef(yaw, 0,0,1); glRotatef(-pitch,0,1,0); glRotatef(roll,1,0,0)
 
+# --- Static meshes: interleaved float32 x,y,z,r,g,b rows uploaded once ---
+MESH_VTX_STRIDE = 6*4
+
+def _mesh_upload(m, mode=None):
+    """Upload mesh rows once (needs a GL context): a VBO, or a display list on pre-1.5 GL.
+       Returns {'vbo'|'list', 'n', 'mode'} for _mesh_draw."""
+    mode = GL_TRIANGLES if mode is None else mode
+    if bool(glGenBuffers):
+        vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, m.nbytes, m, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return {'vbo': vbo, 'n': len(m), 'mode': mode}
+    # client arrays are dereferenced at compile time, so the list owns a copy
+    lid = glGenLists(1)
+    _mesh_pointers(m)
+    glNewList(lid, GL_COMPILE)
+    glDrawArrays(mode, 0, len(m))
+    glEndList()
+    glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+    return {'list': lid, 'n': len(m), 'mode': mode}
+
+def _mesh_pointers(m):
+    # client-side arrays straight from a contiguous rows array (caller keeps it alive)
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, MESH_VTX_STRIDE, ctypes.c_void_p(m.ctypes.data))
+    glColorPointer(3, GL_FLOAT, MESH_VTX_STRIDE, ctypes.c_void_p(m.ctypes.data + 12))
+
+def _mesh_draw(g):
+    if 'list' in g:
+        glCallList(g['list']); return
+    glBindBuffer(GL_ARRAY_BUFFER, g['vbo'])
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, MESH_VTX_STRIDE, ctypes.c_void_p(0))
+    glColorPointer(3, GL_FLOAT, MESH_VTX_STRIDE, ctypes.c_void_p(12))
+    glDrawArrays(g['mode'], 0, g['n'])
+    glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+# --- Baked enemy meshes: one static triangle buffer per ENEMY_BUILDERS type ---
+_enemy_mesh_cpu  = {}       # type -> float32 (n, 6) rows, built from the type's builder + palette
+_enemy_gpu       = {}       # type -> _mesh_upload handle
+
+def enemy_mesh(t):
+    m = _enemy_mesh_cpu.get(t)
+    if m is None:
+        rows = []
+        ENEMY_BUILDERS[t](rows, TYPE_META[t]['colors'])
+        m = _enemy_mesh_cpu[t] = np.array(rows, dtype=np.float32)
+    return m
+
+def enemy_meshes_bake():
+    """Upload every enemy type once (needs a GL context)."""
+    for t in ENEMY_BUILDERS:
+        if t not in _enemy_gpu:
+            m = enemy_mesh(t)
+            _enemy_gpu[t] = _mesh_upload(m)
+            _enemy_gpu[t]['r'] = float(np.sqrt((m[:, :3]**2).sum(axis=1).max()))   # bounding radius
+
+def _enemy_mesh_draw(t):
+    g = _enemy_gpu.get(t)
+    if g is None:
+        enemy_meshes_bake(); g = _enemy_gpu[t]
+    _mesh_draw(g)
+
 def draw_enemy(e):
-    """Render one enemy using its type-specific builder and color palette."""
+    """Render one enemy: its baked type mesh under the entity transform."""
     was_cull = glIsEnabled(GL_CULL_FACE)
     glDisable(GL_LIGHTING)
     if was_cull: glDisable(GL_CULL_FACE)
@@ -926,9 +1275,7 @@ def draw_enemy(e):
     # Scale + draw
     s   = e.get('scale', 1.0)
     glScalef(s, s, s)
-    t   = e['type']
-    pal = TYPE_META[t]['colors']
-    ENEMY_BUILDERS[t](pal)
+    _enemy_mesh_draw(e['type'])
 
     # Pop the matrix pushed by _push_at
     glPopMatrix()
@@ -943,13 +1290,16 @@ def draw_enemies():
     glDisable(GL_LIGHTING)
     if was_cull: glDisable(GL_CULL_FACE)
 
-    for e in enemies:
-        draw_enemy(e)
+    if not _enemy_gpu: enemy_meshes_bake()
+    SX, SY, OK = project_many([(e['p'][0], e['p'][1], e['p'][2] + 20.0) for e in enemies])
+    VIS = frustum_spheres([e['p'] for e in enemies],
+                          [_enemy_gpu[e['type']]['r'] * e.get('scale', 1.0) for e in enemies])
+    for i, e in enumerate(enemies):
+        if VIS[i]: draw_enemy(e)
         # 2D screen overlay: name + health bar
-        scr = _project_to_screen(e['p'][0], e['p'][1], e['p'][2] + 20.0)
-        if not scr: 
+        if not OK[i]:
             continue
-        sx, sy = scr
+        sx, sy = float(SX[i]), float(SY[i])
 
         # name
         draw_screen_text(sx - 20, sy + 14, e['name'], color=(0,0,0))
@@ -1118,37 +1468,6 @@ def update_flares(dt):
             keep.append(f)
     flares[:] = keep
 
-def draw_flares():
-    if not flares: return
-    glDisable(GL_LIGHTING)
-    glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE)
-    for f in flares:
-        # simple camera-facing quad
-        cx, cy = WIN_W*0.5, WIN_H*0.5  # not used; draw in world-space
-        # build right/up from current camera for billboard
-        mv = glGetDoublev(GL_MODELVIEW_MATRIX)
-        right = (mv[0][0], mv[1][0], mv[2][0])
-        up    = (mv[0][1], mv[1][1], mv[2][1])
-        w,h = FLARE_W, FLARE_H
-        px,py,pz = f['p']
-        vx = [px + right[0]*w*0.5, py + right[1]*w*0.5, pz + right[2]*w*0.5]
-        vx2= [px - right[0]*w*0.5, py - right[1]*w*0.5, pz - right[2]*w*0.5]
-        a  = [vx[0] + up[0]*h*0.5, vx[1] + up[1]*h*0.5, vx[2] + up[2]*h*0.5]
-        b  = [vx2[0]+ up[0]*h*0.5, vx2[1]+ up[1]*h*0.5, vx2[2]+ up[2]*h*0.5]
-        c  = [vx2[0]- up[0]*h*0.5, vx2[1]- up[1]*h*0.5, vx2[2]- up[2]*h*0.5]
-        d  = [vx[0] - up[0]*h*0.5, vx[1] - up[1]*h*0.5, vx[2] - up[2]*h*0.5]
-        # bright orange, fade with time
-        alpha = max(0.0, 1.0 - (f['t']/f['life']))
-        glColor4f(1.0, 0.55, 0.05, 0.6*alpha)
-        glBegin(GL_QUADS)
-        glVertex3f(*a); glVertex3f(*b); glVertex3f(*c); glVertex3f(*d)
-        glEnd()
-    glDisable(GL_BLEND)
-
-
-
-
-
 def _nose_and_fwd():
     (fx,fy,fz),_,_ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
     # spawn a bit ahead of the jet
@@ -1210,7 +1529,7 @@ def fire_missile():
 def _retarget_after_fire():
     global _target_id, _lock_timer, _lock_state
     m = MISSILES[MSL_SELECTED]
-    cands = _front_cone_candidates(cone_deg=m['lock_cone_deg'], max_range=m['lock_range'])
+    cands = _front_cone_candidates(cone_deg=m['lock_cone_deg'], max_range=m['lock_range'], limit=1)
     if cands:
         _target_id = cands[0][0]['id']
         _lock_timer = 0.0
@@ -1232,7 +1551,7 @@ def _explode_missile(m):
 
     # 1) Air enemies
     if enemies and rad > 0.0:
-        for e in enemies:
+        for e in grid_query_radius(air_grid, m['pos'][0], m['pos'][1], rad):
             dx = e['p'][0]-m['pos'][0]; dy = e['p'][1]-m['pos'][1]; dz = e['p'][2]-m['pos'][2]
             d = math.sqrt(dx*dx+dy*dy+dz*dz)
             dmg = _aoe_damage_at(d, base, rad, fall)
@@ -1249,11 +1568,13 @@ def _explode_missile(m):
         if dmg > 0.0:
             player_take_damage(dmg, cause="missile")
 
-    # 3) Ground objects (simple horizontal distance check)
-    def _aoe_ground_list(lst, center, rad, base, fall, on_dead):
-        keep=[]
+    # 3) Ground objects (simple horizontal distance check; only units near the blast)
+    near_ground = grid_query_radius(ground_grid, m['pos'][0], m['pos'][1], rad) if rad > 0.0 else []
+    def _aoe_ground_list(lst, cls, center, rad, base, fall, on_dead):
         cx,cy,cz = center
-        for u in lst:
+        dead = set()
+        for u in near_ground:
+            if u['class'] != cls: continue
             dx = u['p'][0]-cx; dy = u['p'][1]-cy
             d = math.hypot(dx,dy)
             dmg = _aoe_damage_at(d, base, rad, fall)
@@ -1262,10 +1583,10 @@ def _explode_missile(m):
                 global score
                 score += 1
             if ('hp' in u and u['hp'] <= 0.0):
-                on_dead(u)
-            else:
-                keep.append(u)
-        return keep
+                on_dead(u); _ground_drop(u)
+                dead.add(id(u))
+        if not dead: return lst
+        return [u for u in lst if id(u) not in dead]
 
     # towers: flip faction if body within AOE
     for i,t in enumerate(towers):
@@ -1277,19 +1598,19 @@ def _explode_missile(m):
 
     # AA on towers
     def _dead_taa(u): spawn_explosion([u['p'][0],u['p'][1],u['p'][2]], base_radius=90.0, ttl=0.6, kind='generic')
-    tower_aas[:] = _aoe_ground_list(tower_aas, m['pos'], rad, base, fall, _dead_taa)
+    tower_aas[:] = _aoe_ground_list(tower_aas, 'TAA', m['pos'], rad, base, fall, _dead_taa)
 
     # Scattered AA
     def _dead_aa(u): spawn_explosion([u['p'][0],u['p'][1],u['z']], base_radius=90.0, ttl=0.6, kind='generic')
-    aa_units[:]   = _aoe_ground_list(aa_units,   m['pos'], rad, base, fall, _dead_aa)
+    aa_units[:]   = _aoe_ground_list(aa_units,  'AA',  m['pos'], rad, base, fall, _dead_aa)
 
     # SAM sites
     def _dead_sam(u): spawn_explosion([u['p'][0],u['p'][1],u['z']], base_radius=110.0, ttl=0.7, kind='generic')
-    sam_units[:]  = _aoe_ground_list(sam_units,  m['pos'], rad, base, fall, _dead_sam)
+    sam_units[:]  = _aoe_ground_list(sam_units, 'SAM', m['pos'], rad, base, fall, _dead_sam)
 
     # Bunkers
     def _dead_b(u): spawn_explosion([u['p'][0],u['p'][1],u['z']+12.0], base_radius=130.0, ttl=0.8, kind='generic')
-    bunkers[:]    = _aoe_ground_list(bunkers,    m['pos'], rad, base, fall, _dead_b)
+    bunkers[:]    = _aoe_ground_list(bunkers,   'BUNKER', m['pos'], rad, base, fall, _dead_b)
 
     # FX
     ttl = 0.5 if m.get('model')=='arrow' else 0.7
@@ -1384,7 +1705,8 @@ def update_missiles(dt):
         collided=False
         prox_hit=False
         if enemies:
-            for e in enemies:
+            reach = max(m['hit_r'] + 1.0, 0.8*ENEMY_HIT_R_MAX)
+            for e in grid_query_radius(air_grid, m['pos'][0], m['pos'][1], reach):
                 dx = e['p'][0]-m['pos'][0]; dy = e['p'][1]-m['pos'][1]; dz = e['p'][2]-m['pos'][2]
                 d2 = dx*dx+dy*dy+dz*dz
                 # body collision
@@ -1402,16 +1724,13 @@ def update_missiles(dt):
         if not collided and not prox_hit:
             fuse = 65.0  # reasonable small fuse sphere
             mp = m['pos']
-            def near(lst, getz):
-                for u in lst:
-                    dx = u['p'][0]-mp[0]; dy=u['p'][1]-mp[1]; dz=getz(u)-mp[2]
+            def near():
+                for u in grid_query_radius(ground_grid, mp[0], mp[1], fuse):
+                    dx = u['p'][0]-mp[0]; dy=u['p'][1]-mp[1]; dz=_ground_aim_z(u)-mp[2]
                     if dx*dx+dy*dy+dz*dz <= fuse*fuse:
                         return True
                 return False
-            if (near(tower_aas, lambda u:u['p'][2]) or
-                near(aa_units,  lambda u:u['z'])    or
-                near(sam_units, lambda u:u['z'])    or
-                near(bunkers,   lambda u:u['z']+12.0)):
+            if near():
                 _explode_missile(m); 
                 continue
 
@@ -1476,6 +1795,7 @@ def draw_missiles():
         return right, up
 
     for m in missiles:
+        if not frustum_sphere(m['pos'][0], m['pos'][1], m['pos'][2], 30.0): continue
         d = _norm3(m['vel'])
         right, up = basis_from_dir(d)
         p = m['pos']          # <-- define position for drawing
@@ -1491,12 +1811,7 @@ def draw_missiles():
         hx, hy, hz = m['pos']
         tx, ty, tz = hx - d[0]*L_tail, hy - d[1]*L_tail, hz - d[2]*L_tail
 
-        # color per missile type (still friendly blue-ish but distinct)
-        if m['key']=='A2A_S':  col = (0.35, 0.90, 1.00)   # bright cyan
-        elif m['key']=='A2A_M':col = (0.20, 0.70, 1.00)   # deeper blue
-        else:                   col = (0.50, 0.85, 1.00)   # pale blue (A2S)
-
-        glColor3f(*col)
+        glColor3f(*MISSILE_TRAIL_RGB.get(m['key'], MISSILE_TRAIL_RGB_OTHER))
 
         if m.get('model') == 'arrow':
             # slim A2A arrow (triangle + tail)
@@ -1537,14 +1852,7 @@ def draw_missiles():
         glPointSize(4.0)
         glBegin(GL_POINTS); glVertex3f(tx,ty,tz); glEnd()
 
-        # trail (fading)
-        if m.get('trail') and len(m['trail']) >= 2:
-            glBegin(GL_LINE_STRIP)
-            for i,p in enumerate(m['trail']):
-                a = (i+1)/float(len(m['trail'])+1)
-                glColor4f(col[0], col[1], col[2], 0.20 + 0.55*a)
-                glVertex3f(*p)
-            glEnd()
+        # (fading trail is emitted by draw_fx)
 
     glDisable(GL_BLEND)
 
@@ -1573,78 +1881,130 @@ def _aoe_damage_at(dist, base, radius, falloff):
 
 def spawn_explosion(pos, base_radius=80.0, ttl=0.7, kind='generic'):
     """Create a lowkey expanding ring + sparks explosion in world space."""
-    explosions.append({'p': pos[:], 't': 0.0, 'ttl': ttl, 'r0': base_radius, 'kind': kind})
+    n = explosions['n']
+    if n == len(explosions['t']):
+        for k in ('p', 't', 'ttl', 'r0', 'rgb'):
+            a = explosions[k]
+            explosions[k] = np.concatenate([a, np.zeros_like(a)])
+    explosions['p'][n] = pos[:3]; explosions['t'][n] = 0.0; explosions['ttl'][n] = ttl
+    explosions['r0'][n] = base_radius
+    explosions['rgb'][n] = EXPLOSION_RGB.get(kind, EXPLOSION_RGB['generic'])
+    explosions['n'] = n + 1
 
 def update_explosions(dt):
-    if not explosions: return
-    keep=[]
-    for ex in explosions:
-        ex['t'] += dt
-        if ex['t'] < ex['ttl']:
-            keep.append(ex)
-    explosions[:] = keep
+    n = explosions['n']
+    if not n: return
+    t = explosions['t'][:n]
+    t += dt
+    alive = t < explosions['ttl'][:n]
+    k = int(alive.sum())
+    if k < n:
+        for key in ('p', 't', 'ttl', 'r0', 'rgb'):
+            a = explosions[key]
+            a[:k] = a[:n][alive]
+        explosions['n'] = k
+
+# --- Particle / FX stream ---
+# Flares, missile trails and explosions are all additive, so each frame they are expanded
+# into one interleaved x,y,z,r,g,b,a array (triangles, then lines, then points) and drawn
+# with a single set of client pointers. Billboard axes come from the cached camera.
+FX_VTX_STRIDE = 7*4
+_FX_EMPTY = np.zeros((0, 7), dtype=np.float32)
+_fx_ring = (np.cos(np.arange(32) * (math.tau/32)), np.sin(np.arange(32) * (math.tau/32)))
+_fx_spark_th = np.arange(6) * (math.pi/3.0)
 
 def _billboard_axes():
-    # camera right/up from current modelview
-    mv = glGetDoublev(GL_MODELVIEW_MATRIX)
-    right = (mv[0][0], mv[1][0], mv[2][0])
-    up    = (mv[0][1], mv[1][1], mv[2][1])
-    return right, up
-
-def draw_explosions():
-    if not explosions: return
-    glDisable(GL_LIGHTING)
-    glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE)  # additive
+    # camera right/up = first two rows of the view matrix (what the modelview holds)
+    if _cam['view'] is None: camera_update()
+    return _cam['view'][0, :3], _cam['view'][1, :3]
+
+def _fx_rows(P, rgba):
+    # (.., 3) positions + per-vertex or broadcast colours -> (m, 7) stream rows
+    P = P.reshape(-1, 3)
+    out = np.empty((len(P), 7), dtype=np.float32)
+    out[:, :3] = P
+    out[:, 3:] = np.broadcast_to(rgba, P.shape[:-1] + (4,)) if np.ndim(rgba) == 1 else np.reshape(rgba, (-1, 4))
+    return out
+
+def _fx_quads(C, hw, hh, rgba, right, up):
+    # camera-facing quads as two triangles each; hw/hh are half sizes (scalar or per quad)
+    R = right[None, :] * np.reshape(hw, (-1, 1)); U = up[None, :] * np.reshape(hh, (-1, 1))
+    a, b, c, d = C + R + U, C - R + U, C - R - U, C + R - U
+    V = np.stack([a, b, c, a, c, d], axis=1)
+    return _fx_rows(V, np.repeat(np.reshape(rgba, (-1, 1, 4)), 6, axis=1) if np.ndim(rgba) == 2 else rgba)
+
+def _fx_flares(right, up):
+    if not flares: return _FX_EMPTY
+    C = np.array([f['p'] for f in flares], dtype=float)
+    a = np.array([max(0.0, 1.0 - f['t']/f['life']) for f in flares])
+    vis = frustum_spheres(C, 0.5*math.hypot(FLARE_W, FLARE_H))
+    rgba = np.column_stack([np.full((len(C), 3), (1.0, 0.55, 0.05)), 0.6*a])   # bright orange, fading
+    return _fx_quads(C[vis], FLARE_W*0.5, FLARE_H*0.5, rgba[vis], right, up)
+
+def _fx_trails():
+    # each fading trail strip as independent segments (per-vertex alpha)
+    rows = []
+    for m in missiles:
+        tr = m.get('trail')
+        if not tr or len(tr) < 2: continue
+        col = MISSILE_TRAIL_RGB.get(m['key'], MISSILE_TRAIL_RGB_OTHER)
+        L = len(tr)
+        for i in range(L - 1):
+            rows.append((*tr[i],   *col, 0.20 + 0.55*(i+1)/(L+1)))
+            rows.append((*tr[i+1], *col, 0.20 + 0.55*(i+2)/(L+1)))
+    return np.array(rows, dtype=np.float32) if rows else _FX_EMPTY
+
+def _fx_explosions(right, up):
+    """(tris, lines, points) for every live explosion: soft core, ring, six sparks."""
+    n = explosions['n']
+    if not n: return _FX_EMPTY, _FX_EMPTY, _FX_EMPTY
+    P = explosions['p'][:n]; t = explosions['t'][:n]
+    u = t / explosions['ttl'][:n]                    # 0..1
+    r = explosions['r0'][:n] * (0.6 + 0.9*u)         # grows over time
+    vis = frustum_spheres(P, r)
+    P, t, r, rgb = P[vis], t[vis], r[vis], explosions['rgb'][:n][vis]
+    alpha = np.maximum(0.0, 1.0 - u[vis]) * 0.8
+    k = len(P)
+    rgba = lambda s: np.column_stack([rgb, alpha*s])
+
+    # ring: 32-segment loop, as line pairs
+    ring = (_fx_ring[0][:, None]*right + _fx_ring[1][:, None]*up)                  # (32, 3)
+    R = P[:, None, :] + ring[None, :, :] * r[:, None, None]
+    seg = np.stack([R, np.roll(R, -1, axis=1)], axis=2)                             # (k, 32, 2, 3)
+    lines = _fx_rows(seg, np.repeat(rgba(0.8), 64, axis=0))
+
+    tris = _fx_quads(P, r*0.4, r*0.4, rgba(0.35), right, up)
+
+    th = _fx_spark_th[None, :] + t[:, None]*6.0                                      # (k, 6)
+    S = np.empty((k, 6, 3))
+    S[..., 0] = P[:, 0:1] + np.cos(th)*r[:, None]*0.6
+    S[..., 1] = P[:, 1:2] + np.sin(th)*r[:, None]*0.6
+    S[..., 2] = P[:, 2:3] + (0.2 - np.abs(np.sin(th))*0.2)*r[:, None]*0.2
+    pts = _fx_rows(S, np.repeat(rgba(1.0), 6, axis=0))
+    return tris, lines, pts
+
+def draw_fx():
+    """Flares, missile trails and explosions: one additive vertex stream per frame."""
     right, up = _billboard_axes()
-    for ex in explosions:
-        u = ex['t']/ex['ttl']        # 0..1
-        r = ex['r0']*(0.6 + 0.9*u)   # grows over time
-        # color per kind
-        if ex['kind']=='aircraft':
-            base = (1.0, 0.6, 0.1)
-        elif ex['kind']=='missile':
-            base = (0.9, 0.95, 1.0)
-        else:
-            base = (0.95, 0.8, 0.4)
-        alpha = max(0.0, 1.0 - u) * 0.8
-
-        px,py,pz = ex['p']
-        # ring (line loop)
-        seg = 32
-        glColor4f(base[0], base[1], base[2], alpha*0.8)
-        glBegin(GL_LINE_LOOP)
-        for i in range(seg):
-            th = 2.0*math.pi*i/seg
-            vx = (right[0]*math.cos(th) + up[0]*math.sin(th))*r
-            vy = (right[1]*math.cos(th) + up[1]*math.sin(th))*r
-            vz = (right[2]*math.cos(th) + up[2]*math.sin(th))*r
-            glVertex3f(px+vx, py+vy, pz+vz)
-        glEnd()
-        # soft core (billboard quad)
-        w = r*0.8; h = r*0.8
-        a = (px + right[0]*w*0.5 + up[0]*h*0.5,
-             py + right[1]*w*0.5 + up[1]*h*0.5,
-             pz + right[2]*w*0.5 + up[2]*h*0.5)
-        b = (px - right[0]*w*0.5 + up[0]*h*0.5,
-             py - right[1]*w*0.5 + up[1]*h*0.5,
-             pz - right[2]*w*0.5 + up[2]*h*0.5)
-        c = (px - right[0]*w*0.5 - up[0]*h*0.5,
-             py - right[1]*w*0.5 - up[1]*h*0.5,
-             pz - right[2]*w*0.5 - up[2]*h*0.5)
-        d = (px + right[0]*w*0.5 - up[0]*h*0.5,
-             py + right[1]*w*0.5 - up[1]*h*0.5,
-             pz + right[2]*w*0.5 - up[2]*h*0.5)
-        glColor4f(base[0], base[1], base[2], alpha*0.35)
-        glBegin(GL_QUADS); glVertex3f(*a); glVertex3f(*b); glVertex3f(*c); glVertex3f(*d); glEnd()
-
-        # few sparks
+    e_tris, e_lines, e_pts = _fx_explosions(right, up)
+    tris  = np.concatenate([_fx_flares(right, up), e_tris])
+    lines = np.concatenate([_fx_trails(), e_lines])
+    S = np.ascontiguousarray(np.concatenate([tris, lines, e_pts]))
+    if not len(S): return
+    glDisable(GL_LIGHTING)
+    glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE)
+    glDepthMask(GL_FALSE)   # additive and order-free: test against the scene, don't occlude each other
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, FX_VTX_STRIDE, ctypes.c_void_p(S.ctypes.data))
+    glColorPointer(4, GL_FLOAT, FX_VTX_STRIDE, ctypes.c_void_p(S.ctypes.data + 12))
+    nt, nl = len(tris), len(lines)
+    if nt: glDrawArrays(GL_TRIANGLES, 0, nt)
+    if nl: glDrawArrays(GL_LINES, nt, nl)
+    if len(e_pts):
         glPointSize(3.0)
-        glColor4f(base[0], base[1], base[2], alpha)
-        glBegin(GL_POINTS)
-        for i in range(6):
-            th = (i*math.pi/3.0) + ex['t']*6.0
-            glVertex3f(px + math.cos(th)*r*0.6, py + math.sin(th)*r*0.6, pz + (0.2-math.fabs(math.sin(th))*0.2)*r*0.2)
-        glEnd()
+        glDrawArrays(GL_POINTS, nt + nl, len(e_pts))
+    glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+    glDepthMask(GL_TRUE)
     glDisable(GL_BLEND)
 
 
@@ -1655,8 +2015,9 @@ def _prune_dead_ground():
         keep=[]
         for u in lst:
             if 'hp' in u and u['hp'] <= 0.0:
-                px,py = u['p']; pz = (u['p'][2] if 'p' in u and len(u['p'])>2 else u.get('z',0.0)) + z_off
+                px,py = u['p'][0], u['p'][1]; pz = (u['p'][2] if 'p' in u and len(u['p'])>2 else u.get('z',0.0)) + z_off
                 spawn_explosion([px,py,pz], base_radius=100.0, ttl=0.6, kind='generic')
+                _ground_drop(u)
             else:
                 keep.append(u)
         return keep
@@ -1884,7 +2245,8 @@ def player_take_damage(amount, cause=""):
 
 
 # --------- Terrain height (simple, cheap) ---------
-def terrain_h(x, y):
+def _terrain_h_raw(x, y):
+    """Analytic terrain surface before the sea-level clamp (what the heightfield bakes)."""
     # base ridges (cheap trig noise)
     s = 0.0013
     ridges = (math.sin(x*s)*math.cos(y*s)*0.65 +
@@ -1902,13 +2264,242 @@ def terrain_h(x, y):
     trench = -VALLEY_DEPTH * math.exp(-(d*d) / (2.0*(VALLEY_WIDTH**2))) * w_ax
 
     h = h0 + trench
-    return max(GROUND_PLANE_Z, h*0.6 + GROUND_PLANE_Z)
+    return h*0.6 + GROUND_PLANE_Z
+
+def _terrain_h_exact(x, y):
+    return max(GROUND_PLANE_Z, _terrain_h_raw(x, y))
+
+def _terrain_h_raw_many(xs, ys):
+    # same formula as _terrain_h_raw, NumPy-broadcast over xs/ys
+    x = np.asarray(xs, dtype=np.float64); y = np.asarray(ys, dtype=np.float64)
+    s = 0.0013
+    ridges = (np.sin(x*s)*np.cos(y*s)*0.65 +
+              np.cos(x*s*0.6)*np.sin(y*s*0.6)*0.45 +
+              np.sin(x*s*1.7 + 1.3)*np.sin(y*s*1.9 - 0.8)*0.25)
+    h0 = ridges * TERRAIN_MAX_H * TERRAIN_MOUNTAIN_GAIN
+
+    vx, vy = math.cos(VALLEY_SEED_TH), math.sin(VALLEY_SEED_TH)
+    nx, ny = -vy, vx
+    dx, dy = (x - VALLEY_CENTER[0]), (y - VALLEY_CENTER[1])
+    t  = dx*vx + dy*vy
+    d  = dx*nx + dy*ny
+    w_ax = np.exp(-(t*t) / (2.0*(VALLEY_LEN*0.9)**2))
+    trench = -VALLEY_DEPTH * np.exp(-(d*d) / (2.0*(VALLEY_WIDTH**2))) * w_ax
+
+    h = h0 + trench
+    return h*0.6 + GROUND_PLANE_Z
+
+TERRAIN_BATCH_MIN = 48   # below this many points NumPy call overhead loses to the scalar cache
+
+def terrain_h_many(xs, ys):
+    """Terrain heights for whole arrays of x/y at once (broadcasts like any NumPy op).
+       Large batches evaluate the analytic surface, small ones go through terrain_h();
+       either way results agree with terrain_h() within HF_TOLERANCE."""
+    xs = np.asarray(xs, dtype=np.float64); ys = np.asarray(ys, dtype=np.float64)
+    if xs.shape == ys.shape and xs.size < TERRAIN_BATCH_MIN:
+        hs = [terrain_h(x, y) for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())]
+        return np.array(hs, dtype=np.float64).reshape(xs.shape)
+    return np.maximum(_terrain_h_raw_many(xs, ys), GROUND_PLANE_Z)
+
+
+# --------- Heightfield cache (baked terrain) ---------
+# terrain_h() reads float32 grids baked from _terrain_h_raw(), interpolates
+# bilinearly and applies the sea-level clamp afterwards (clamping before would
+# put a kink inside cells). Nodes sit on every GROUND_STEP corner, so ground
+# tiles get the exact surface; anywhere else the error stays below
+# HF_TOLERANCE (~3 u measured with the default shape controls).
+HF_CELL      = GROUND_STEP / 8.0   # node spacing (75 u)
+HF_CHUNK     = 64                  # cells per chunk side (4800 u chunks)
+HF_CACHE_MAX = 384                 # LRU capacity in chunks (~6.5 MB)
+HF_TOLERANCE = 4.0                 # max |terrain_h - _terrain_h_exact|
+
+_hf_chunks = OrderedDict()   # (ci, cj) -> array('f') or mapped memoryview('f'), (HF_CHUNK+1)^2 nodes, row-major in y
+_hf_last_key  = None         # last chunk hit (skips the LRU shuffle for runs of nearby queries)
+_hf_last_grid = None
+
+def _hf_bake_chunk(ci, cj):
+    idx = np.arange(HF_CHUNK + 1)
+    xs  = (ci*HF_CHUNK + idx) * HF_CELL
+    ys  = (cj*HF_CHUNK + idx) * HF_CELL
+    g   = array('f')
+    g.frombytes(_terrain_h_raw_many(xs[None, :], ys[:, None]).astype(np.float32).tobytes())
+    return g
+
+# Baked chunks are appended to a per-parameter-set file under HF_DISK_DIR; later
+# runs mmap it and serve terrain_h straight from the mapping instead of baking.
+# File: header, then fixed-size records of (ci, cj) + float32 grid. A torn
+# trailing record is dropped on open; a header mismatch rewrites the file.
+# Files for other parameter sets are pruned when the cache opens.
+HF_DISK_CACHE      = True
+HF_DISK_DIR        = os.environ.get('OBH_CACHE_DIR') or os.path.join(
+    (os.environ.get('LOCALAPPDATA') if os.name == 'nt' else os.environ.get('XDG_CACHE_HOME'))
+    or os.path.join(os.path.expanduser('~'), '.cache'), 'operation-black-hawk')
+HF_DISK_VERSION    = 1
+HF_DISK_MAX_CHUNKS = 2048                  # per file (~35 MB), later chunks stay in memory only
+_HF_HDR = struct.Struct('<4sIId16s')      # magic, version, HF_CHUNK, HF_CELL, parameter digest
+_HF_REC = struct.Struct('<ii')            # chunk key in front of each grid
+
+_hf_disk = None   # None = not opened yet, False = disabled/unavailable, else dict(fh, mm, index, count)
+
+def _hf_disk_digest():
+    params = (TERRAIN_SEED, TERRAIN_MAX_H, TERRAIN_MOUNTAIN_GAIN, VALLEY_SEED_TH, VALLEY_CENTER,
+              VALLEY_LEN, VALLEY_WIDTH, VALLEY_DEPTH, GROUND_PLANE_Z, HF_CELL, HF_CHUNK)
+    return hashlib.blake2b(repr(params).encode(), digest_size=16).digest()
+
+def _hf_lock(fh, block=True):
+    """Advisory exclusive lock on the cache file (other processes may share it).
+       False if it couldn't be taken; True when the platform has no locking."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+        elif msvcrt is not None:
+            fh.seek(0); msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK if block else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+def _hf_unlock(fh):
+    try:
+        if fcntl is not None: fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None: fh.seek(0); msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+def _hf_disk_open():
+    global _hf_disk
+    _hf_disk = False
+    if not HF_DISK_CACHE: return
+    digest = _hf_disk_digest()
+    hdr = _HF_HDR.pack(b'OBHF', HF_DISK_VERSION, HF_CHUNK, HF_CELL, digest)
+    rec = _HF_REC.size + 4*(HF_CHUNK+1)**2
+    try:
+        os.makedirs(HF_DISK_DIR, exist_ok=True)
+        name = 'terrain_%s.hf' % digest.hex()
+        fh = open(os.path.join(HF_DISK_DIR, name), 'a+b')
+    except OSError:
+        return
+    # header repair and tail truncation only under the lock; if another process holds it,
+    # map the complete records read-only and never write
+    ro = not _hf_lock(fh, block=False)
+    try:
+        fh.seek(0)
+        if fh.read(_HF_HDR.size) != hdr:
+            if ro: raise ValueError('cache busy with a foreign header')
+            fh.truncate(0); fh.write(hdr); fh.flush()
+        n = (os.fstat(fh.fileno()).st_size - _HF_HDR.size) // rec
+        if not ro:
+            fh.truncate(_HF_HDR.size + n*rec); fh.flush()
+            _hf_disk_prune(name)
+        index, mm = {}, None
+        if n:
+            mm = mmap.mmap(fh.fileno(), _HF_HDR.size + n*rec, access=mmap.ACCESS_READ)
+            for k in range(n):
+                off = _HF_HDR.size + k*rec
+                index[_HF_REC.unpack_from(mm, off)] = off + _HF_REC.size
+    except (OSError, ValueError):
+        if not ro: _hf_unlock(fh)
+        fh.close()
+        return
+    if not ro: _hf_unlock(fh)
+    _hf_disk = {'fh': fh, 'mm': mm, 'index': index, 'count': n, 'rec': rec, 'ro': ro}
+
+def _hf_disk_prune(keep):
+    # files baked under other parameter digests are never read again
+    for fn in os.listdir(HF_DISK_DIR):
+        if fn.startswith('terrain_') and fn.endswith('.hf') and fn != keep:
+            try: os.remove(os.path.join(HF_DISK_DIR, fn))
+            except OSError: pass
+
+def _hf_disk_close():
+    global _hf_disk
+    if _hf_disk:
+        # the file handle closes even if live NumPy views keep the map open (BufferError);
+        # the mmap holds its own descriptor and goes away with the last view
+        try:
+            if _hf_disk['mm'] is not None: _hf_disk['mm'].close()
+        except (OSError, BufferError):
+            pass
+        finally:
+            try: _hf_disk['fh'].close()
+            except OSError: pass
+    _hf_disk = None
+
+def _hf_on_disk(key):
+    if _hf_disk is None: _hf_disk_open()
+    return bool(_hf_disk) and key in _hf_disk['index']
+
+def _hf_disk_put(key, g):
+    # append a freshly baked chunk; it's mapped on the next run (None marks "written, not mapped")
+    d = _hf_disk
+    if not d or d['ro'] or key in d['index'] or d['count'] >= HF_DISK_MAX_CHUNKS: return
+    fh = d['fh']
+    if not _hf_lock(fh): return
+    try:
+        # another process may have died mid-record: realign before appending
+        end = os.fstat(fh.fileno()).st_size
+        torn = (end - _HF_HDR.size) % d['rec']
+        if torn: fh.truncate(end - torn)
+        fh.write(_HF_REC.pack(*key) + g.tobytes()); fh.flush()
+    except OSError:
+        return
+    finally:
+        _hf_unlock(fh)
+    d['index'][key] = None
+    d['count'] += 1
+
+def _hf_load(key):
+    """Grid for one chunk: a view into the mapped cache file if present, else baked (and appended)."""
+    if _hf_on_disk(key):
+        off = _hf_disk['index'][key]
+        if off is not None:
+            return memoryview(_hf_disk['mm'])[off:off + 4*(HF_CHUNK+1)**2].cast('f')
+    g = _hf_bake_chunk(*key)
+    _hf_disk_put(key, g)
+    return g
+
+def _hf_chunk(key):
+    global _hf_last_key, _hf_last_grid
+    g = _hf_chunks.get(key)
+    if g is None:
+        g = _hf_load(key)
+        _hf_chunks[key] = g
+        if len(_hf_chunks) > HF_CACHE_MAX:
+            _hf_chunks.popitem(last=False)
+    else:
+        _hf_chunks.move_to_end(key)
+    _hf_last_key, _hf_last_grid = key, g
+    return g
+
+def hf_clear():
+    """Drop all baked chunks (call after changing any TERRAIN_*/VALLEY_* control)."""
+    global _hf_last_key, _hf_last_grid
+    _hf_chunks.clear()
+    _hf_max_chunks.clear()
+    _hf_last_key = _hf_last_grid = None
+    los_cache_clear()
+    _hf_disk_close()   # reopened (under the new parameter digest) on next use
+
+def terrain_h(x, y):
+    gx = x / HF_CELL; gy = y / HF_CELL
+    ix = math.floor(gx); iy = math.floor(gy)
+    ci = ix // HF_CHUNK; cj = iy // HF_CHUNK
+    key = (ci, cj)
+    g  = _hf_last_grid if key == _hf_last_key else _hf_chunk(key)
+    fx = gx - ix; fy = gy - iy
+    k  = (iy - cj*HF_CHUNK)*(HF_CHUNK+1) + (ix - ci*HF_CHUNK)
+    z00 = g[k];              z10 = g[k+1]
+    z01 = g[k+HF_CHUNK+1];   z11 = g[k+HF_CHUNK+2]
+    z0 = z00 + (z10 - z00)*fx
+    z1 = z01 + (z11 - z01)*fx
+    h  = z0 + (z1 - z0)*fy
+    return h if h > GROUND_PLANE_Z else GROUND_PLANE_Z
 
 
 
 
 def terrain_slope_deg(x, y, eps=3.0):
-    h = terrain_h
+    # eps is far below HF_CELL, so differentiate the analytic surface
+    h = _terrain_h_exact
     hx = (h(x+eps,y) - h(x-eps,y)) / (2.0*eps)
     hy = (h(x,y+eps) - h(x,y-eps)) / (2.0*eps)
     return math.degrees(math.atan(math.hypot(hx, hy)))
@@ -1917,12 +2508,162 @@ def terrain_slope_deg(x, y, eps=3.0):
 
 
 
+# --------- Max-height pyramid (hierarchical LOS) ---------
+# Per heightfield chunk: level 0 holds the max of each cell's four nodes,
+# each level above halves the resolution, level HF_MAX_LEVELS-1 is the chunk
+# max. Interpolated and analytic heights inside a cell stay below its level-0
+# value + HF_TOLERANCE, so a ray span above that bound cannot hit terrain.
+LOS_HIERARCHICAL = True
+LOS_LEAF_SAMPLES = 4           # spans this short are sampled directly
+HF_MAX_LEVELS    = HF_CHUNK.bit_length()          # 64 cells -> 7 levels (64x64 .. 1x1)
+_HF_MAX_OFS      = [sum((HF_CHUNK >> k)**2 for k in range(L)) for L in range(HF_MAX_LEVELS)]
+
+_hf_max_chunks = OrderedDict()   # (ci, cj) -> array('f'), all levels back to back
+
+def _hf_max_build(key):
+    n = HF_CHUNK
+    G = np.frombuffer(_hf_chunk(key), dtype=np.float32).reshape(n + 1, n + 1)
+    m = np.maximum(np.maximum(G[:-1, :-1], G[:-1, 1:]), np.maximum(G[1:, :-1], G[1:, 1:]))
+    levels = [m]
+    while m.shape[0] > 1:
+        m = np.maximum(np.maximum(m[0::2, 0::2], m[0::2, 1::2]), np.maximum(m[1::2, 0::2], m[1::2, 1::2]))
+        levels.append(m)
+    g = array('f')
+    g.frombytes(np.concatenate([l.ravel() for l in levels]).tobytes())
+    return g
+
+def _hf_max_chunk(key):
+    g = _hf_max_chunks.get(key)
+    if g is None:
+        g = _hf_max_chunks[key] = _hf_max_build(key)
+        if len(_hf_max_chunks) > HF_CACHE_MAX:
+            _hf_max_chunks.popitem(last=False)
+    return g
+
+def _hf_max_rect(x0, y0, x1, y1):
+    """Upper bound of the baked surface over an axis-aligned box, or None if the
+       box is wider than one chunk (caller splits instead)."""
+    size = max(x1 - x0, y1 - y0)
+    L = 0
+    while HF_CELL * (1 << L) < size:
+        L += 1
+        if L >= HF_MAX_LEVELS: return None
+    c = HF_CELL * (1 << L)
+    side = HF_CHUNK >> L
+    base = _HF_MAX_OFS[L]
+    m = GROUND_PLANE_Z
+    for ix in range(math.floor(x0 / c), math.floor(x1 / c) + 1):
+        for iy in range(math.floor(y0 / c), math.floor(y1 / c) + 1):
+            ci = ix // side; cj = iy // side
+            v = _hf_max_chunk((ci, cj))[base + (iy - cj*side)*side + (ix - ci*side)]
+            if v > m: m = v
+    return m
+
+def _los_walk(ax, ay, az, dx, dy, dz, samples, clearance):
+    # Same samples and test as the flat version, but sample runs whose ray stays above the
+    # pyramid bound are skipped wholesale. Leaf heights come from the source the flat
+    # version would have used (analytic for big batches, heightfield otherwise).
+    h = _terrain_h_exact if samples - 1 >= TERRAIN_BATCH_MIN else terrain_h
+    inv = 1.0 / samples
+    margin = clearance + HF_TOLERANCE
+    stack = [(1, samples - 1)]
+    while stack:
+        i0, i1 = stack.pop()
+        if i1 - i0 < LOS_LEAF_SAMPLES:
+            for i in range(i0, i1 + 1):
+                t = i * inv
+                if h(ax + dx*t, ay + dy*t) + clearance >= az + dz*t:
+                    return False
+            continue
+        t0 = i0 * inv; t1 = i1 * inv
+        x0 = ax + dx*t0; x1 = ax + dx*t1
+        y0 = ay + dy*t0; y1 = ay + dy*t1
+        top = _hf_max_rect(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        if top is not None and top + margin < az + dz*(t0 if dz > 0.0 else t1):
+            continue
+        mid = (i0 + i1) // 2
+        stack.append((mid + 1, i1)); stack.append((i0, mid))
+    return True
+
+
+def _los_margin_walk(ax, ay, az, dx, dy, dz, samples, clearance, cap):
+    """Same samples/test as has_line_of_sight -> (visible, ra, rb), where with v the sample's
+       margin (ray z - terrain - clearance) ra = min v/(1-t) and rb = min v/t, capped at cap.
+       For a blocked ray they come from the blocking sample (as -v). Branch and bound on the
+       pyramid: spans that can't lower either minimum are skipped."""
+    h = _terrain_h_exact if samples - 1 >= TERRAIN_BATCH_MIN else terrain_h
+    inv = 1.0 / samples
+    ra = rb = cap
+    stack = [(1, samples - 1)]
+    while stack:
+        i0, i1 = stack.pop()
+        if i1 - i0 < LOS_LEAF_SAMPLES:
+            for i in range(i0, i1 + 1):
+                t = i * inv
+                v = az + dz*t - h(ax + dx*t, ay + dy*t) - clearance
+                if v <= 0.0:
+                    return False, min(cap, -v/(1.0 - t)), min(cap, -v/t)
+                if v < ra*(1.0 - t): ra = v/(1.0 - t)
+                if v < rb*t:         rb = v/t
+            continue
+        t0 = i0 * inv; t1 = i1 * inv
+        x0 = ax + dx*t0; x1 = ax + dx*t1
+        y0 = ay + dy*t0; y1 = ay + dy*t1
+        top = _hf_max_rect(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        if top is not None:
+            lb = az + dz*(t0 if dz > 0.0 else t1) - top - HF_TOLERANCE - clearance
+            if lb > 0.0 and lb >= ra*(1.0 - t0) and lb >= rb*t1:
+                continue
+        mid = (i0 + i1) // 2
+        stack.append((mid + 1, i1)); stack.append((i0, mid))
+    return True, ra, rb
+
+
 # ---- Simple terrain line-of-sight (LOS) check ----
-def has_line_of_sight(a, b, clearance=25.0, step_xy=600.0):
+# Results can be cached per (unit key, clearance). Moving endpoint a by da and b
+# by db moves the ray point at t by at most da*(1-t) + db*t, and the terrain
+# under it by LOS_TERRAIN_GRAD times that, so a sample with margin v keeps its
+# verdict while (1+LOS_TERRAIN_GRAD)*(da*(1-t) + db*t) < |v|. The cache keeps
+# the worst case of that over the samples as one reach per endpoint, and is
+# dropped whenever the sample count changes (the samples themselves move then).
+LOS_CACHE          = True
+LOS_TERRAIN_GRAD   = 2.0        # bound on |grad terrain_h| (default shape controls measure ~1.6)
+LOS_CACHE_MAX_D    = 2000.0     # longest reuse distance per endpoint (also caps the margin search)
+LOS_CACHE_MAX      = 4096
+
+_los_cache = {}   # (key, clearance) -> (a, b, samples, visible, reach_a, reach_b)
+
+def los_cache_clear():
+    _los_cache.clear()
+
+def _los_cached(key, a, b, clearance):
+    if isinstance(key, int): key = ('AIR', key)     # enemy ids double as AIR target ids
+    ck = (key, clearance)
+    ax, ay, az = a[0], a[1], a[2]
+    dx, dy, dz = b[0] - ax, b[1] - ay, b[2] - az
+    samples = max(1, int(math.hypot(dx, dy) / 480.0))
+    c = _los_cache.get(ck)
+    if c is not None and c[2] == samples:
+        ra, rb = c[4], c[5]
+        if math.dist(a, c[0])*rb + math.dist(b, c[1])*ra < ra*rb:
+            return c[3]
+    k = 1.0 + LOS_TERRAIN_GRAD
+    if samples < 2:
+        vis, ra, rb = True, 0.0, 0.0          # trivially visible, nothing worth caching
+    else:
+        vis, ra, rb = _los_margin_walk(ax, ay, az, dx, dy, dz, samples, clearance, LOS_CACHE_MAX_D*k)
+    if len(_los_cache) >= LOS_CACHE_MAX: _los_cache.clear()
+    _los_cache[ck] = ((ax, ay, az), (b[0], b[1], b[2]), samples, vis, ra/k, rb/k)
+    return vis
+
+def has_line_of_sight(a, b, clearance=25.0, step_xy=600.0, key=None):
     """
     Return True if straight line a->b stays above terrain everywhere (with a small clearance).
     a,b: [x,y,z] world points. step_xy≈ground tile size for sampling density.
+    key: stable id for this pair (target id / ('SAM', id) ...) to reuse results across frames.
     """
+    if key is not None and LOS_CACHE and step_xy == 600.0:
+        return _los_cached(key, a, b, clearance)
     ax, ay, az = a[0], a[1], a[2]
     bx, by, bz = b[0], b[1], b[2]
     dx, dy = (bx - ax), (by - ay)
@@ -1930,14 +2671,13 @@ def has_line_of_sight(a, b, clearance=25.0, step_xy=600.0):
     if dist_xy < 1e-3:
         return True
     samples = max(1, int(dist_xy / max(200.0, step_xy*0.8)))
-    for i in range(1, samples):
-        t = i / float(samples)
-        x = ax + dx*t
-        y = ay + dy*t
-        z = az + (bz - az)*t
-        if terrain_h(x, y) + clearance >= z:
-            return False
-    return True
+    if samples < 2:
+        return True
+    if LOS_HIERARCHICAL:
+        return _los_walk(ax, ay, az, dx, dy, bz - az, samples, clearance)
+    t = np.arange(1, samples) / float(samples)
+    hz = terrain_h_many(ax + dx*t, ay + dy*t)
+    return not np.any(hz + clearance >= az + (bz - az)*t)
 
 
 
@@ -2018,10 +2758,7 @@ def rotate_around_axis(p, a0, a1, deg):
 
 
 def _enemy_by_id(eid):
-    for e in enemies:
-        if e.get('id') == eid:
-            return e
-    return None
+    return _enemy_index.get(eid)
 
 def _resolve_target_pos(tid):
     """tid can be int (legacy air), or ('AIR'|'TAA'|'AA'|'SAM'|'BUNKER', gid). Returns [x,y,z] or None."""
@@ -2045,70 +2782,83 @@ def _resolve_target_label(tid):
     return tid[0]
 
 
-def _front_cone_candidates(cone_deg, max_range=None):
-    """Return [(e, screen_err)] inside forward cone, sorted center-first, optionally within range, LOS-gated."""
-    (fx,fy,fz), _, _ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
-    dot_min = math.cos(math.radians(cone_deg))
-    cx, cy = WIN_W*0.5, WIN_H*0.5
-    cands = []
-    eye = [pos[0], pos[1], pos[2]]
-    for e in enemies:
-        vx = e['p'][0] - pos[0]; vy = e['p'][1] - pos[1]; vz = e['p'][2] - pos[2]
-        L  = math.sqrt(vx*vx + vy*vy + vz*vz) + 1e-9
-        if max_range and L > max_range:
-            continue
-        dp = (fx*vx + fy*vy + fz*vz) / L
-        if dp < dot_min:
-            continue
-        # NEW: terrain LOS gate
-        if not has_line_of_sight(eye, e['p'], clearance=30.0):
-            continue
-        scr = _project_to_screen(e['p'][0], e['p'][1], e['p'][2])
-        if not scr:
-            continue
-        sx, sy = scr
-        err = (sx - cx)*(sx - cx) + (sy - cy)*(sy - cy)
-        cands.append((e, err))
-    cands.sort(key=lambda t: t[1])
-    return cands
-
-
-
-def _front_cone_candidates_any(cone_deg, max_range, allow):
+# ---- Shared targeting query ----
+# Lock, cycle, retarget, the HUD highlight and the reticle all filter one table built
+# per view (sim step or rendered frame). Positions of every targetable entity are packed
+# into one array so cone, range and screen error are plain array ops; terrain LOS only
+# runs on the survivors, center-first, and at most once per entity per view.
+_TQ_KINDS = ('AIR', 'TAA', 'AA', 'SAM', 'BUNKER')   # row kind codes (index)
+_tq = {'key': None}
+_tq_ground = {'gen': None}   # ground units are static: pack them once per _ground_gen
+
+def _tq_ground_pack():
+    if _tq_ground['gen'] == _ground_gen: return _tq_ground
+    P, kind, tid, ref = [], [], [], []
+    for code, lst in ((1, tower_aas), (2, aa_units), (3, sam_units), (4, bunkers)):
+        name = _TQ_KINDS[code]
+        for u in lst:
+            if   code == 1: P.append((u['p'][0], u['p'][1], u['p'][2]))
+            elif code == 4: P.append((u['p'][0], u['p'][1], u['z'] + 12.0))
+            else:           P.append((u['p'][0], u['p'][1], u['z']))
+            kind.append(code); tid.append((name, u['id'])); ref.append(u)
+    _tq_ground.update(gen=_ground_gen, P=np.array(P, dtype=float).reshape(-1, 3),
+                      kind=np.array(kind, dtype=np.int8), tid=tid, ref=ref)
+    return _tq_ground
+
+def targeting_query():
+    """Packed table for every targetable entity, memoized per view:
+       P (n,3), kind codes, tid/ref lists, cone cosine 'dot', range 'L', screen 'err'
+       (inf when off-screen) and 'los' (-1 unknown, 0/1 once traced)."""
+    key = (sim_time, pos[0], pos[1], pos[2], yaw_deg, pitch_deg, roll_deg, _cam['gen'])
+    if _tq['key'] == key: return _tq
+    g = _tq_ground_pack()
+    P = np.concatenate([np.array([e['p'] for e in enemies], dtype=float).reshape(-1, 3), g['P']])
+    kind = np.concatenate([np.zeros(len(enemies), dtype=np.int8), g['kind']])
     (fx,fy,fz), _, _ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
-    dot_min = math.cos(math.radians(cone_deg))
+    V = P - (pos[0], pos[1], pos[2])
+    L = np.sqrt((V*V).sum(axis=1)) + 1e-9
+    sx, sy, ok = project_many(P)
     cx, cy = WIN_W*0.5, WIN_H*0.5
-    cands = []
-    eye = [pos[0], pos[1], pos[2]]
-
-    def _try(world_p, tid):
-        vx = world_p[0]-pos[0]; vy = world_p[1]-pos[1]; vz = world_p[2]-pos[2]
-        L  = math.sqrt(vx*vx+vy*vy+vz*vz) + 1e-9
-        if max_range and L > max_range: return
-        dp = (fx*vx + fy*vy + fz*vz) / L
-        if dp < dot_min: return
-        # NEW: terrain LOS gate
-        if not has_line_of_sight(eye, world_p, clearance=30.0):
-            return
-        scr = _project_to_screen(world_p[0], world_p[1], world_p[2])
-        if not scr: return
-        sx,sy = scr
-        err = (sx-cx)*(sx-cx)+(sy-cy)*(sy-cy)
-        cands.append((tid, err))
-
-    if 'AIR' in allow:
-        for e in enemies: _try(e['p'], ('AIR', e['id']))
-    if 'TAA' in allow:
-        for u in tower_aas: _try([u['p'][0],u['p'][1],u['p'][2]], ('TAA', u['id']))
-    if 'AA' in allow:
-        for u in aa_units: _try([u['p'][0],u['p'][1],u['z']], ('AA', u['id']))
-    if 'SAM' in allow:
-        for u in sam_units: _try([u['p'][0],u['p'][1],u['z']], ('SAM', u['id']))
-    if 'BUNKER' in allow:
-        for u in bunkers: _try([u['p'][0],u['p'][1],u['z']+12.0], ('BUNKER', u['id']))
+    with np.errstate(invalid='ignore'):
+        err = np.where(ok, (sx-cx)*(sx-cx) + (sy-cy)*(sy-cy), np.inf)
+    _tq.update(key=key, P=P, kind=kind, L=L, err=err, dot=(V @ (fx, fy, fz)) / L,
+               tid=[('AIR', e['id']) for e in enemies] + g['tid'], ref=enemies[:] + g['ref'],
+               los=np.full(len(P), -1, dtype=np.int8), eye=[pos[0], pos[1], pos[2]])
+    return _tq
+
+def _tq_visible(q, i):
+    if q['los'][i] < 0:
+        q['los'][i] = has_line_of_sight(q['eye'], q['P'][i].tolist(), clearance=30.0, key=q['tid'][i])
+    return q['los'][i] > 0
+
+def _tq_select(cone_deg, max_range=None, allow=('AIR',), limit=None):
+    """Row indices inside the forward cone (and range), on screen and LOS-clear, center-first.
+       With limit, stops tracing LOS once that many are confirmed."""
+    q = targeting_query()
+    m = q['dot'] >= math.cos(math.radians(cone_deg))
+    m &= np.isfinite(q['err'])
+    if max_range: m &= q['L'] <= max_range
+    if len(allow) < len(_TQ_KINDS):
+        km = np.zeros(len(m), dtype=bool)
+        for k in allow: km |= q['kind'] == _TQ_KINDS.index(k)
+        m &= km
+    idx = np.flatnonzero(m)
+    idx = idx[np.argsort(q['err'][idx], kind='stable')]
+    out = []
+    for i in idx:
+        if _tq_visible(q, i):
+            out.append(i)
+            if limit and len(out) >= limit: break
+    return out
+
+def _front_cone_candidates(cone_deg, max_range=None, limit=None):
+    """Return [(e, screen_err)] inside forward cone, sorted center-first, optionally within range, LOS-gated."""
+    idx = _tq_select(cone_deg, max_range, limit=limit)
+    return [(_tq['ref'][i], float(_tq['err'][i])) for i in idx]
 
-    cands.sort(key=lambda t:t[1])
-    return cands
+def _front_cone_candidates_any(cone_deg, max_range, allow, limit=None):
+    idx = _tq_select(cone_deg, max_range, allow, limit)
+    return [(_tq['tid'][i], float(_tq['err'][i])) for i in idx]
 
 
 
@@ -2119,31 +2869,39 @@ def _front_cone_candidates_any(cone_deg, max_range, allow):
 
 
 # ---------------- Ground (streamed tiles) ----------------
-def draw_ground(center_x, center_y):
+def _ground_patch_radius():
+    R0 = GROUND_PATCH_RADIUS_STEPS
+    return min(R0, 12 + int(abs(pos[2]) / 2500.0))  # small patch low, grows with altitude, capped by R0
+
+def _draw_ground_immediate(center_x, center_y):
+    # fallback path: one glBegin per tile (used when buffer objects are unavailable)
     glDisable(GL_LIGHTING)
     step = GROUND_STEP
     half = GROUND_EXTENT
     # compute player's current tile indices
     cx = int(math.floor(center_x / step))
     cy = int(math.floor(center_y / step))
-    
-    R0 = GROUND_PATCH_RADIUS_STEPS
-    R  = min(R0, 12 + int(abs(pos[2]) / 2500.0))  # small patch low, grows with altitude, capped by R0
+    R  = _ground_patch_radius()
+
+    # corner heights for the whole patch in one batch: Z[j][i] is corner (cx-R+i, cy-R+j)
+    corner_x = np.arange(cx - R, cx + R + 2) * step
+    corner_y = np.arange(cy - R, cy + R + 2) * step
+    Z = terrain_h_many(corner_x[None, :], corner_y[:, None]).tolist()
 
     # draw a patch around the player (non-planar tiles)
     for i in range(cx - R, cx + R + 1):
         x0 = i * step
         if x0 < -half or x0 > half: continue
+        a = i - (cx - R)
         for j in range(cy - R, cy + R + 1):
             y0 = j * step
             if y0 < -half or y0 > half: continue
             x1 = x0 + step; y1 = y0 + step
+            b = j - (cy - R)
 
             # heights at 4 corners
-            z00 = terrain_h(x0, y0)
-            z10 = terrain_h(x1, y0)
-            z11 = terrain_h(x1, y1)
-            z01 = terrain_h(x0, y1)
+            z00 = Z[b][a];     z10 = Z[b][a+1]
+            z11 = Z[b+1][a+1]; z01 = Z[b+1][a]
 
             # checker tint
             if ((i + j) & 1):
@@ -2158,6 +2916,266 @@ def draw_ground(center_x, center_y):
             glEnd()
 
 
+# --- Retained-mode ground: static VBO/IBO per chunk of tiles ---
+GROUND_RETAINED    = True   # False -> _draw_ground_immediate (cleared in init_gl if VBOs are missing)
+GROUND_MODE        = 'lod'  # 'lod' quadtree out to FAR_Z, or 'patch' fixed-step tiles (toggle with 'g')
+GROUND_CHUNK_TILES = 16     # tiles per chunk side (9600 u level-0 chunks)
+GROUND_VTX_STRIDE  = 6*4    # interleaved float32 x,y,z,r,g,b
+GROUND_GPU_MAX     = 640    # resident chunk buffers before the least recently drawn are freed
+
+# Quadtree LOD: a level-L node is one chunk mesh whose tiles are GROUND_STEP * 2^L wide.
+# A node splits while the eye is closer than LOD_SPLIT_K node sizes; K >= 1.42 keeps
+# neighbouring leaves within one level, which is what the seam stitching relies on.
+# With K = 1.5 the whole FAR_Z disc is ~190 nodes (~100k triangles) wherever you fly.
+LOD_SPLIT_K   = 1.5
+LOD_MAX_LEVEL = 8           # 2.4M u root nodes cover GROUND_EXTENT with 2x2 roots
+
+# seam bits: which sides border a coarser (level L+1) leaf
+SEAM_W, SEAM_E, SEAM_S, SEAM_N = 1, 2, 4, 8
+
+_ground_gpu = OrderedDict() # (level, ci, cj, seams) -> {'vbo', 'ibo', 'n', 'origin'}
+_TILE_IDX   = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)   # same winding as the immediate path
+
+def _lod_node_size(level):
+    return GROUND_CHUNK_TILES * GROUND_STEP * (1 << level)
+
+def _ground_chunk_mesh(ci, cj, level=0, seams=0):
+    """CPU half of one ground chunk: 4 verts per tile (own checker colour) relative to
+       the chunk origin, plus the triangle list for tiles inside GROUND_EXTENT.
+       Edges flagged in `seams` get their odd vertices snapped onto the coarser neighbour's edge."""
+    n, half = GROUND_CHUNK_TILES, GROUND_EXTENT
+    step = GROUND_STEP * (1 << level)
+    ti = np.arange(ci*n, ci*n + n)
+    tj = np.arange(cj*n, cj*n + n)
+    Z  = terrain_h_many(np.arange(ci*n, ci*n + n + 1)[None, :] * step,
+                        np.arange(cj*n, cj*n + n + 1)[:, None] * step)
+    # crack-free T-junctions: the coarse edge is straight between our even vertices
+    if seams & SEAM_W: Z[1:n:2, 0] = 0.5*(Z[0:n-1:2, 0] + Z[2:n+1:2, 0])
+    if seams & SEAM_E: Z[1:n:2, n] = 0.5*(Z[0:n-1:2, n] + Z[2:n+1:2, n])
+    if seams & SEAM_S: Z[0, 1:n:2] = 0.5*(Z[0, 0:n-1:2] + Z[0, 2:n+1:2])
+    if seams & SEAM_N: Z[n, 1:n:2] = 0.5*(Z[n, 0:n-1:2] + Z[n, 2:n+1:2])
+
+    I, J = np.meshgrid(ti, tj)                   # [row=j, col=i]
+    ox, oy = ci*n*step, cj*n*step
+    x0 = I*step - ox; y0 = J*step - oy
+    x1 = x0 + step;   y1 = y0 + step
+
+    v = np.empty((n, n, 4, 6), dtype=np.float32)
+    v[:, :, 0, 0] = x0; v[:, :, 0, 1] = y0; v[:, :, 0, 2] = Z[:-1, :-1]
+    v[:, :, 1, 0] = x1; v[:, :, 1, 1] = y0; v[:, :, 1, 2] = Z[:-1, 1:]
+    v[:, :, 2, 0] = x1; v[:, :, 2, 1] = y1; v[:, :, 2, 2] = Z[1:, 1:]
+    v[:, :, 3, 0] = x0; v[:, :, 3, 1] = y1; v[:, :, 3, 2] = Z[1:, :-1]
+    v[:, :, :, 3:6] = np.where((I + J) & 1, 0.82, 0.74)[:, :, None, None]   # checker tint
+
+    inside = ((I*step >= -half) & (I*step <= half) & (J*step >= -half) & (J*step <= half)).ravel()
+    base = (np.flatnonzero(inside) * 4).astype(np.uint32)
+    idx  = (base[:, None] + _TILE_IDX[None, :]).ravel()
+    return {'key': (level, ci, cj, seams), 'origin': (ox, oy), 'verts': v.reshape(-1, 6), 'idx': idx,
+            'zmin': float(Z.min()), 'zmax': float(Z.max())}
+
+def _ground_upload(mesh):
+    vbo, ibo = glGenBuffers(2)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, mesh['verts'].nbytes, mesh['verts'], GL_STATIC_DRAW)
+    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+    glBufferData(GL_ELEMENT_ARRAY_BUFFER, mesh['idx'].nbytes, mesh['idx'], GL_STATIC_DRAW)
+    ch = {'vbo': vbo, 'ibo': ibo, 'n': int(mesh['idx'].size), 'origin': mesh['origin'],
+          'zmin': mesh['zmin'], 'zmax': mesh['zmax']}
+    _ground_gpu[mesh['key']] = ch
+    return ch
+
+def _ground_release(key):
+    ch = _ground_gpu.pop(key, None)
+    if ch: glDeleteBuffers(2, [ch['vbo'], ch['ibo']])
+
+def _ground_chunk_range(center_x, center_y):
+    # chunk index bounds covering the (2R+1)^2 tile patch around (center_x, center_y)
+    n = GROUND_CHUNK_TILES
+    cx = int(math.floor(center_x / GROUND_STEP))
+    cy = int(math.floor(center_y / GROUND_STEP))
+    R  = _ground_patch_radius()
+    return (cx - R)//n, (cx + R)//n, (cy - R)//n, (cy + R)//n
+
+def _lod_select(eye):
+    """Quadtree leaves for this eye: {(level, i, j)}. Distance is measured from the eye to
+       the node footprint on the ground plane, so altitude coarsens everything below."""
+    leaves = set()
+    n0 = int(math.ceil(GROUND_EXTENT / _lod_node_size(LOD_MAX_LEVEL)))
+    stack = [(LOD_MAX_LEVEL, i, j) for i in range(-n0, n0) for j in range(-n0, n0)]
+    dz2 = (eye[2] - GROUND_PLANE_Z)**2
+    while stack:
+        L, i, j = stack.pop()
+        S = _lod_node_size(L)
+        x0, y0 = i*S, j*S
+        if x0 > GROUND_EXTENT or y0 > GROUND_EXTENT or x0 + S < -GROUND_EXTENT or y0 + S < -GROUND_EXTENT:
+            continue
+        dx = max(x0 - eye[0], 0.0, eye[0] - (x0 + S))
+        dy = max(y0 - eye[1], 0.0, eye[1] - (y0 + S))
+        d  = math.sqrt(dx*dx + dy*dy + dz2)
+        if d > FAR_Z:
+            continue
+        if L > 0 and d < LOD_SPLIT_K * S:
+            i2, j2 = i*2, j*2
+            stack += [(L-1, i2, j2), (L-1, i2+1, j2), (L-1, i2, j2+1), (L-1, i2+1, j2+1)]
+        else:
+            leaves.add((L, i, j))
+    return leaves
+
+def _lod_keys(eye):
+    # leaves + seam bits (a side is a seam when the neighbour's parent is itself a leaf)
+    leaves = _lod_select(eye)
+    keys = []
+    for L, i, j in leaves:
+        seams = 0
+        if L < LOD_MAX_LEVEL:
+            up = L + 1
+            if (up, (i-1) >> 1, j >> 1) in leaves: seams |= SEAM_W
+            if (up, (i+1) >> 1, j >> 1) in leaves: seams |= SEAM_E
+            if (up, i >> 1, (j-1) >> 1) in leaves: seams |= SEAM_S
+            if (up, i >> 1, (j+1) >> 1) in leaves: seams |= SEAM_N
+        keys.append((L, i, j, seams))
+    return keys
+
+# --- Background chunk builders: workers produce meshes/heightfield grids, render thread uploads ---
+GROUND_ASYNC       = True        # False -> build missing chunks inline on the render thread
+GROUND_WORKERS     = 2
+GROUND_UPLOADS_PER_FRAME = 8     # cap on glBufferData pairs per display()
+GROUND_PREFETCH_S  = (2.0, 5.0)  # look-ahead times along the flight vector
+
+_ground_pool     = None
+_ground_pending  = {}            # ('mesh', key) | ('hf', (ci, cj)) -> Future
+_ground_ready    = []            # finished meshes waiting for an upload slot
+_ground_ready_keys = set()       # their keys, so they aren't requested again meanwhile
+_ground_prefetch_cell = None
+
+def _ground_pool_get():
+    global _ground_pool
+    if _ground_pool is None:
+        _ground_pool = ThreadPoolExecutor(max_workers=GROUND_WORKERS, thread_name_prefix='terrain')
+    return _ground_pool
+
+def _ground_request(key):
+    # queue a mesh build unless it's resident or already in flight
+    job = ('mesh', key)
+    if key in _ground_gpu or key in _ground_ready_keys or job in _ground_pending: return
+    _ground_pending[job] = _ground_pool_get().submit(_ground_chunk_mesh, key[1], key[2], key[0], key[3])
+
+def _hf_request(key):
+    job = ('hf', key)
+    if key in _hf_chunks or job in _ground_pending or _hf_on_disk(key): return
+    _ground_pending[job] = _ground_pool_get().submit(_hf_bake_chunk, *key)
+
+def _ground_collect():
+    """Render-thread side: adopt finished worker results. Heightfield grids go straight into
+       the terrain_h cache; meshes are uploaded, at most GROUND_UPLOADS_PER_FRAME per call."""
+    for job in [j for j, f in _ground_pending.items() if f.done()]:
+        kind, key = job
+        try:
+            res = _ground_pending.pop(job).result()
+        except Exception as ex:   # leave it un-pending so the next request retries it
+            print(f"ground: {kind} build {key} failed: {ex!r}", file=sys.stderr)
+            continue
+        if kind == 'hf':
+            if key not in _hf_chunks:
+                _hf_chunks[key] = res
+                _hf_disk_put(key, res)
+                if len(_hf_chunks) > HF_CACHE_MAX: _hf_chunks.popitem(last=False)
+        elif key not in _ground_gpu and key not in _ground_ready_keys:
+            _ground_ready.append(res); _ground_ready_keys.add(key)
+    n = min(len(_ground_ready), GROUND_UPLOADS_PER_FRAME)
+    for mesh in _ground_ready[:n]:
+        _ground_ready_keys.discard(mesh['key'])
+        if mesh['key'] not in _ground_gpu: _ground_upload(mesh)
+    del _ground_ready[:n]
+
+def _ground_keys_at(eye):
+    if GROUND_MODE == 'lod':
+        return _lod_keys(eye)
+    ci0, ci1, cj0, cj1 = _ground_chunk_range(eye[0], eye[1])
+    return [(0, ci, cj, 0) for ci in range(ci0, ci1 + 1) for cj in range(cj0, cj1 + 1)]
+
+def _ground_prefetch():
+    # queue chunks (and heightfield grids) around where the jet will be in GROUND_PREFETCH_S;
+    # only re-plan when the farthest look-ahead point enters a new level-0 chunk
+    global _ground_prefetch_cell
+    (fx,fy,fz), _, _ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
+    ahead = [(pos[0] + fx*speed*T, pos[1] + fy*speed*T, clamp(pos[2] + fz*speed*T, PLAYER_ALT_MIN, PLAYER_ALT_MAX))
+             for T in GROUND_PREFETCH_S]
+    S0 = _lod_node_size(0)
+    cell = (int(ahead[-1][0] // S0), int(ahead[-1][1] // S0), GROUND_MODE)
+    if cell == _ground_prefetch_cell: return
+    _ground_prefetch_cell = cell
+    W = HF_CHUNK * HF_CELL
+    for eye in ahead:
+        for key in _ground_keys_at(eye):
+            _ground_request(key)
+        hi, hj = int(eye[0] // W), int(eye[1] // W)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                _hf_request((hi + di, hj + dj))
+
+def _ground_stand_in(key):
+    # same node with a different seam mask (briefly shows hairline cracks instead of a hole)
+    L, i, j, _ = key
+    for sm in range(16):
+        ch = _ground_gpu.get((L, i, j, sm))
+        if ch: return ch
+    return None
+
+def ground_warmup():
+    """Build and upload every chunk visible from the current position (startup, needs GL)."""
+    keys = [k for k in _ground_keys_at((pos[0], pos[1], pos[2])) if k not in _ground_gpu]
+    for mesh in _ground_pool_get().map(lambda k: _ground_chunk_mesh(k[1], k[2], k[0], k[3]), keys):
+        _ground_upload(mesh)
+
+def _ground_chunk_visible(key, ch):
+    # chunk AABB vs the frustum; unbuilt chunks get the whole terrain height range
+    L, ci, cj, _ = key
+    S = _lod_node_size(L)
+    x0, y0 = ci*S, cj*S
+    if ch is not None: z0, z1 = ch['zmin'], ch['zmax']
+    else: z0, z1 = GROUND_PLANE_Z, GROUND_PLANE_Z + 0.81*TERRAIN_MAX_H*TERRAIN_MOUNTAIN_GAIN   # 0.6 * sum of ridge amplitudes
+    return frustum_aabb(x0, y0, z0, x0 + S, y0 + S, z1)
+
+def _ground_draw_keys(keys):
+    if GROUND_ASYNC:
+        _ground_collect()
+        _ground_prefetch()
+    glDisable(GL_LIGHTING)
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+    for key in keys:
+        ch = _ground_gpu.get(key)
+        # off-screen chunks stay resident and queued so turning around doesn't rebuild them
+        if ch is not None: _ground_gpu.move_to_end(key)
+        elif GROUND_ASYNC: _ground_request(key)
+        if not _ground_chunk_visible(key, ch): continue
+        if ch is None:
+            if GROUND_ASYNC:
+                ch = _ground_stand_in(key)
+                if ch is None: continue
+            else:
+                ch = _ground_upload(_ground_chunk_mesh(key[1], key[2], key[0], key[3]))
+        if not ch['n']: continue
+        glBindBuffer(GL_ARRAY_BUFFER, ch['vbo'])
+        glVertexPointer(3, GL_FLOAT, GROUND_VTX_STRIDE, ctypes.c_void_p(0))
+        glColorPointer(3, GL_FLOAT, GROUND_VTX_STRIDE, ctypes.c_void_p(12))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ch['ibo'])
+        glPushMatrix(); glTranslatef(ch['origin'][0], ch['origin'][1], 0.0)
+        glDrawElements(GL_TRIANGLES, ch['n'], GL_UNSIGNED_INT, None)
+        glPopMatrix()
+    glBindBuffer(GL_ARRAY_BUFFER, 0); glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+    glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+
+    # free the least recently drawn chunks once over budget
+    while len(_ground_gpu) > max(GROUND_GPU_MAX, len(keys)):
+        _ground_release(next(iter(_ground_gpu)))
+
+def draw_ground(center_x, center_y):
+    if not GROUND_RETAINED:
+        _draw_ground_immediate(center_x, center_y); return
+    _ground_draw_keys(_ground_keys_at((center_x, center_y, pos[2])))
+
+
 
 
 
@@ -2222,7 +3240,7 @@ def update_world(dt):
         dist = math.hypot(pos[0]-t['p'][0], pos[1]-t['p'][1])
         if dist <= 5_000.0:
             t['loiter_t'] += dt
-            if t['faction']==FACTION_FOE and t['loiter_t'] >= 20.0 and (time.time()-t['last_hit']>20.0):
+            if t['faction']==FACTION_FOE and t['loiter_t'] >= 20.0 and (sim_time-t['last_hit']>20.0):
                 t['faction'] = FACTION_FRIEND
         else:
             t['loiter_t'] = max(0.0, t['loiter_t'] - dt*0.5)  # decay
@@ -2236,7 +3254,7 @@ def mark_tower_hit(tower_idx, by_player=True):
             return  # safe poke: no faction change beyond 5km
     # inside bubble (or non-player hit) => hostile
     t['faction'] = FACTION_FOE
-    t['last_hit'] = time.time()
+    t['last_hit'] = sim_time
     t['loiter_t'] = 0.0
 
 
@@ -2261,6 +3279,8 @@ def draw_world():
 
         dx = x - pos[0]; dy = y - pos[1]
         if (dx*dx + dy*dy) > TOWER_DRAW_DIST2: continue
+        z0 = t.get('z0', GROUND_PLANE_Z)
+        if not frustum_aabb(x - r, y - r, z0, x + r, y + r, z0 + h): continue
         
             
 
@@ -2272,85 +3292,140 @@ def draw_world():
         _draw_cylinder_z(h, r, slices=16, rgb=col)
         glPopMatrix()
 
-    # AA pods on towers
-    for a in tower_aas:
-        x,y,z = a['p']; tw = towers[a['tower_idx']]
-        glColor3f(0.1,0.1,1.0) if tw['faction']==FACTION_FRIEND else glColor3f(0.8,0.2,0.2)
-        glPushMatrix(); glTranslatef(x,y,z); glutSolidCube(35.0); glPopMatrix()
+    draw_ground_units(OBJ_DRAW_DIST2)
 
-    # scattered AA / SAM
-    for u in aa_units:
-        x,y = u['p']; z = u['z']
-        glPushMatrix(); glTranslatef(x, y, z)
-        # flat square pad (red enemy AA)
-        s = 14.0
-        glColor3f(1.0, 0.25, 0.25)
-        glBegin(GL_QUADS)
-        glVertex3f(-s, -s, 0.0); glVertex3f( s, -s, 0.0)
-        glVertex3f( s,  s, 0.0); glVertex3f(-s,  s, 0.0)
-        glEnd()
-        # tiny upright “turret” nub
-        glBegin(GL_QUADS)
-        glVertex3f(-4, -4, 0.0); glVertex3f( 4, -4, 0.0)
-        glVertex3f( 4,  4, 0.0); glVertex3f(-4,  4, 0.0)
-        glEnd()
-        glPopMatrix()
 
+# --- Batched ground units: one draw call per class per frame ---
+# Fixed-function GL has no instancing, so instances are expanded on the CPU instead:
+# a class template (object-space triangles) plus each visible unit's offset, sent as
+# one client array. Positions are static and packed once per _ground_gen.
+_ground_tmpl = {}               # 'pod' | 'aa_pad' | 'aa_gun' | 'sam' | 'bunker' -> float32 (m, 3)
+_ground_pack = {'gen': None}    # per-class (k, 3) anchor arrays, rebuilt when units change
+_ground_tmpl_r = {}             # template bounding radius about its anchor (frustum culling)
 
-        dx = x - pos[0]; dy = y - pos[1]
-        if (dx*dx + dy*dy) > OBJ_DRAW_DIST2: continue
-        
-
-
-        glColor3f(0.2,0.2,0.2); glPushMatrix(); glTranslatef(x,y,z); glutSolidTeapot(25.0); glPopMatrix()
-
-
-
-
-
-
-    for u in sam_units:
-        x,y = u['p']; z = u['z']
-
-        dx = x - pos[0]; dy = y - pos[1]
-        if (dx*dx + dy*dy) > OBJ_DRAW_DIST2: continue
-        
-
-        
-        glPushMatrix(); glTranslatef(x,y,z)
-        # color by state: loaded+aiming = bright, aiming+reloading = dim purple, idle = gray
-        if u.get('aiming', False):
-            glColor3f(0.95, 0.20, 0.20) if u.get('loaded', True) else glColor3f(0.40, 0.15, 0.60)
-        else:
-            glColor3f(0.25, 0.25, 0.28)
-        glutSolidCone(30.0, 80.0, 8, 1)
-        # show an aim ray when aiming
-        if u.get('aiming', False):
-            to = _norm3([pos[0]-x, pos[1]-y, pos[2]-z])
+def _capture_solid(draw, extent):
+    """Object-space triangles of an immediate-mode solid (GLUT cube/cone/teapot), read back
+       once through GL feedback so it can be batched like our own meshes. `extent` bounds it."""
+    R, S = float(extent), 4096
+    vp = glGetIntegerv(GL_VIEWPORT)
+    was_cull = glIsEnabled(GL_CULL_FACE)
+    glDisable(GL_CULL_FACE)
+    glViewport(0, 0, S, S)
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); glOrtho(-R, R, -R, R, -R, R)
+    glMatrixMode(GL_MODELVIEW);  glPushMatrix(); glLoadIdentity()
+    glFeedbackBuffer(1 << 20, GL_3D)
+    glRenderMode(GL_FEEDBACK)
+    draw()
+    fb = glRenderMode(GL_RENDER)
+    glMatrixMode(GL_PROJECTION); glPopMatrix()
+    glMatrixMode(GL_MODELVIEW);  glPopMatrix()
+    glViewport(*vp)
+    if was_cull: glEnable(GL_CULL_FACE)
+    tris = []
+    for tok in fb:
+        if tok[0] != GL_POLYGON_TOKEN: continue
+        vs = [v.vertex for v in tok[1:]]
+        tris += [(vs[0], vs[k], vs[k+1]) for k in range(1, len(vs) - 1)]   # polygons come back as fans
+    w = np.array(tris, dtype=float).reshape(-1, 3)
+    # window coords back to object space (ortho above, depth range [0, 1])
+    w[:, 0] = (w[:, 0] / S * 2.0 - 1.0) * R
+    w[:, 1] = (w[:, 1] / S * 2.0 - 1.0) * R
+    w[:, 2] = (1.0 - 2.0 * w[:, 2]) * R
+    return w.astype(np.float32)
+
+def ground_meshes_bake():
+    """Templates for the ground-unit classes (needs a GL context and glutInit)."""
+    if _ground_tmpl: return
+    s = 14.0
+    pad  = [((-s,-s,0.0), ( s,-s,0.0), ( s, s,0.0)), ((-s,-s,0.0), ( s, s,0.0), (-s, s,0.0)),
+            ((-4,-4,0.0), ( 4,-4,0.0), ( 4, 4,0.0)), ((-4,-4,0.0), ( 4, 4,0.0), (-4, 4,0.0))]
+    _ground_tmpl['aa_pad'] = np.array(pad, dtype=np.float32).reshape(-1, 3)
+    _ground_tmpl['pod']    = _capture_solid(lambda: glutSolidCube(35.0), 40.0)
+    _ground_tmpl['aa_gun'] = _capture_solid(lambda: glutSolidTeapot(25.0), 60.0)
+    _ground_tmpl['sam']    = _capture_solid(lambda: glutSolidCone(30.0, 80.0, 8, 1), 100.0)
+    _ground_tmpl['bunker'] = _capture_solid(lambda: glutSolidCube(1.0), 1.0) * np.float32((120.0, 90.0, 60.0))
+    _ground_tmpl_r.update((k, float(np.sqrt((v*v).sum(axis=1).max(initial=0.0)))) for k, v in _ground_tmpl.items())
+
+def _ground_batch_pack():
+    if _ground_pack['gen'] == _ground_gen: return _ground_pack
+    def _xyz(rows): return np.array(rows, dtype=float).reshape(-1, 3)
+    _ground_pack.update(gen=_ground_gen,
+                        pod=_xyz([u['p'] for u in tower_aas]),
+                        aa=_xyz([(u['p'][0], u['p'][1], u['z']) for u in aa_units]),
+                        sam=_xyz([(u['p'][0], u['p'][1], u['z']) for u in sam_units]),
+                        bunker=_xyz([(u['p'][0], u['p'][1], u['z'] + 12.0) for u in bunkers]))
+    return _ground_pack
+
+def _draw_batch(tmpl, xyz, rgb, origin):
+    """All instances of one template in a single glDrawArrays. xyz: (k,3) anchors;
+       rgb: one colour, or a (k,3) array of per-instance colours."""
+    k, m = len(xyz), len(tmpl)
+    if not k or not m: return
+    V = (tmpl[None, :, :] + (xyz - origin).astype(np.float32)[:, None, :]).reshape(-1, 3)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, V)
+    if isinstance(rgb, tuple):
+        glColor3f(*rgb)
+        glDrawArrays(GL_TRIANGLES, 0, k*m)
+    else:
+        C = np.repeat(np.asarray(rgb, dtype=np.float32), m, axis=0)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glColorPointer(3, GL_FLOAT, 0, C)
+        glDrawArrays(GL_TRIANGLES, 0, k*m)
+        glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def draw_ground_units(max_d2):
+    """Tower AA pods, AA sites, SAMs and bunkers: each class batched into one call.
+       Everything but the tower pods is culled beyond sqrt(max_d2) from the player."""
+    if not _ground_tmpl: ground_meshes_bake()
+    g = _ground_batch_pack()
+    # vertices are sent relative to a local origin to keep float32 precision near the player
+    origin = np.array([round(pos[0]), round(pos[1]), 0.0])
+    glPushMatrix(); glTranslatef(origin[0], origin[1], 0.0)
+
+    def _near(xyz, r):
+        d = xyz[:, :2] - (pos[0], pos[1])
+        return np.flatnonzero(((d*d).sum(axis=1) <= max_d2) & frustum_spheres(xyz, r))
+
+    # AA pods on towers (coloured by their tower's faction)
+    if tower_aas:
+        vis = np.flatnonzero(frustum_spheres(g['pod'], _ground_tmpl_r['pod']))
+        friend = np.array([towers[tower_aas[i]['tower_idx']]['faction'] == FACTION_FRIEND for i in vis])
+        rgb = np.where(friend.reshape(-1, 1), (0.1, 0.1, 1.0), (0.8, 0.2, 0.2))
+        _draw_batch(_ground_tmpl['pod'], g['pod'][vis], rgb, origin)
+
+    # scattered AA: flat square pad (red enemy AA) with a tiny “turret” nub, plus the gun
+    vis = _near(g['aa'], max(_ground_tmpl_r['aa_pad'], _ground_tmpl_r['aa_gun']))
+    _draw_batch(_ground_tmpl['aa_pad'], g['aa'][vis], (1.0, 0.25, 0.25), origin)
+    _draw_batch(_ground_tmpl['aa_gun'], g['aa'][vis], (0.2, 0.2, 0.2), origin)
+
+    # SAMs: color by state: loaded+aiming = bright, aiming+reloading = dim purple, idle = gray
+    vis = _near(g['sam'], max(_ground_tmpl_r['sam'], 125.0))   # cone, or its aim ray
+    if len(vis):
+        rgb, rays = [], []
+        for i in vis:
+            u = sam_units[i]
+            if u.get('aiming', False):
+                rgb.append((0.95, 0.20, 0.20) if u.get('loaded', True) else (0.40, 0.15, 0.60))
+                # show an aim ray when aiming
+                x, y, z = g['sam'][i] - origin
+                to = _norm3([pos[0]-g['sam'][i][0], pos[1]-g['sam'][i][1], pos[2]-g['sam'][i][2]])
+                rays += [(x, y, z+40), (x+to[0]*80.0, y+to[1]*80.0, z+40+to[2]*80.0)]
+            else:
+                rgb.append((0.25, 0.25, 0.28))
+        _draw_batch(_ground_tmpl['sam'], g['sam'][vis], np.array(rgb), origin)
+        if rays:
             glColor3f(0.9, 0.5, 1.0)
-            glBegin(GL_LINES)
-            glVertex3f(0,0,40)
-            glVertex3f(to[0]*80.0, to[1]*80.0, 40 + to[2]*80.0)
-            glEnd()
-        glPopMatrix()
-
-
-
-
-
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 0, np.array(rays, dtype=np.float32))
+            glDrawArrays(GL_LINES, 0, len(rays))
+            glDisableClientState(GL_VERTEX_ARRAY)
 
     # bunkers (trapezoid box)
-    for b in bunkers:
-        x,y = b['p']; z=b['z']
-
-        dx = x - pos[0]; dy = y - pos[1]
-        if (dx*dx + dy*dy) > OBJ_DRAW_DIST2: continue
-        
-
-
-        glPushMatrix(); glTranslatef(x,y,z+12.0); glScalef(120.0,90.0,60.0)
-        glColor3f(0.25,0.25,0.25); glutSolidCube(1.0)
-        glPopMatrix()
+    vis = _near(g['bunker'], _ground_tmpl_r['bunker'])
+    _draw_batch(_ground_tmpl['bunker'], g['bunker'][vis], (0.25, 0.25, 0.25), origin)
+    glPopMatrix()
 
 
 
@@ -2363,6 +3438,7 @@ def world_init():
     # clear all world lists
     towers.clear(); tower_aas.clear()
     aa_units.clear(); sam_units.clear(); bunkers.clear()
+    _ground_clear()
 
     # --- Towers of God (vertical, base sits on local terrain) ---
     for _ in range(TOWER_COUNT):
@@ -2382,7 +3458,7 @@ def world_init():
         for _pod in range(n_pods):
             th = random.random() * math.tau
             z  = z0 + random.uniform(500.0, 6000.0)  # pod altitude above base
-            tower_aas.append({
+            _ground_add(tower_aas, {
                 'id': _new_gid(), 'class': 'TAA',
                 'p': [x + TOWER_R * math.cos(th), y + TOWER_R * math.sin(th), z],
                 'tower_idx': len(towers) - 1,
@@ -2398,7 +3474,7 @@ def world_init():
         else:
             # anywhere near spawn
             ax, ay = _rand_xy(PLACEMENT_RADIUS)
-        aa_units.append({
+        _ground_add(aa_units, {
             'id': _new_gid(), 'class': 'AA',
             'p': [ax, ay],
             'z': terrain_h(ax, ay),
@@ -2415,7 +3491,7 @@ def world_init():
             # keep SAM sites well-separated
             if all((sx - tx) * (sx - tx) + (sy - ty) * (sy - ty) > (25_000.0 ** 2) for tx, ty in taken):
                 taken.append((sx, sy))
-                sam_units.append({
+                _ground_add(sam_units, {
                     'id': _new_gid(), 'class': 'SAM',
                     'p': [sx, sy],
                     'z': terrain_h(sx, sy),
@@ -2445,7 +3521,7 @@ def spawn_bunker_cluster():
         dx = math.cos(i*math.tau/cnt)*600.0
         dy = math.sin(i*math.tau/cnt)*600.0
         x,y = cx+dx, cy+dy
-        bunkers.append({'id': _new_gid(), 'class':'BUNKER', 'p':[x,y], 'z':terrain_h(x,y),
+        _ground_add(bunkers, {'id': _new_gid(), 'class':'BUNKER', 'p':[x,y], 'z':terrain_h(x,y),
                 'cluster_id':cluster_id, 'hp':220, 'hp_max':220})
 
     # defense ring: AA and a few SAMs
@@ -2457,12 +3533,12 @@ def spawn_bunker_cluster():
         ring.append((x,y))
     for i,(x,y) in enumerate(ring):
         if i % 3 == 0:
-            sam_units.append({'id': _new_gid(), 'class':'SAM',
+            _ground_add(sam_units, {'id': _new_gid(), 'class':'SAM',
                             'p':[x,y], 'z':terrain_h(x,y),
                             'hp':160, 'hp_max':160, 'cool':0.0,
                             'loaded': True, 'aiming': False})
         else:
-            aa_units.append({'id': _new_gid(), 'class':'AA',
+            _ground_add(aa_units, {'id': _new_gid(), 'class':'AA',
                             'p':[x,y], 'z':terrain_h(x,y),
                             'hp':100, 'hp_max':100, 'cool':0.0})
 
@@ -2481,15 +3557,15 @@ def spawn_bunker_cluster():
 
 
 # ---------------- Jet ----------------
-def draw_f117(elevonL_deg=0.0, elevonR_deg=0.0, rudder_deg_vis=0.0):
-    # debug palette
-    def dbg_color(i):
-        pal = [(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1),(0,1,1),
-               (0.9,0.5,0.1),(0.5,0.9,0.1),(0.1,0.9,0.5),
-               (0.9,0.1,0.5),(0.5,0.1,0.9),(0.3,0.7,0.9),
-               (0.7,0.3,0.9),(0.9,0.7,0.3),(0.3,0.9,0.7)]
-        return pal[i % len(pal)]
-
+# --- F-117: the hull is baked once per dev_colors palette; only the flap strips
+#     depend on input, and they are rebuilt only when a deflection changes ---
+_f117_geo   = {}    # 'V', 'faces', 'tail_quads' (hull geometry, built once)
+_f117_gpu   = {}    # dev_colors -> {'hull': mesh, 'ink': mesh or None}
+_f117_flaps = {'key': None, 'rows': None}
+F117_FLAP_COLOR = (0.86,0.87,0.89)  # greyish white
+
+def _f117_geometry():
+    if _f117_geo: return _f117_geo
     # vertices
     V = {
         "N":(120,0,4), "CL":(100,-28,12), "CR":(100,28,12),
@@ -2548,13 +3624,27 @@ def draw_f117(elevonL_deg=0.0, elevonR_deg=0.0, rudder_deg_vis=0.0):
     faces += [("TIL","ADC","BAL"),("ADC","AFTB","BAL"),
               ("ADC","TIR","BAR"),("ADC","BAR","AFTB")]
 
+    _f117_geo.update(V=V, faces=faces, tail_quads=tail_quads)
+    return _f117_geo
+
+def _f117_bake(dev):
+    """Hull triangles (faces + V-tail quads) and, in the standard palette, the edge-ink lines."""
+    g = _f117_geometry(); V, faces, tail_quads = g['V'], g['faces'], g['tail_quads']
+
+    # debug palette
+    def dbg_color(i):
+        pal = [(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1),(0,1,1),
+               (0.9,0.5,0.1),(0.5,0.9,0.1),(0.1,0.9,0.5),
+               (0.9,0.1,0.5),(0.5,0.1,0.9),(0.3,0.7,0.9),
+               (0.7,0.3,0.9),(0.9,0.7,0.3),(0.3,0.9,0.7)]
+        return pal[i % len(pal)]
+
     # Baked materials
     JET_DARK  = (0.08,0.08,0.09)
     JET_BASE2 = (0.10,0.10,0.11)
     JET_LIGHT = (0.16,0.16,0.17)
     WIN_COLOR = (0.75,0.85,1.00)
     EXH_COLOR = (0.45,0.22,0.22)
-    FLAP_COLOR = (0.86,0.87,0.89)  # greyish white
 
     WINDOWS = {("WRR","CNR","R1"), ("WRL","R1","CNL")}
     EXHAUST = {
@@ -2600,55 +3690,101 @@ def draw_f117(elevonL_deg=0.0, elevonR_deg=0.0, rudder_deg_vis=0.0):
                 max(0.0, min(1.0, rgb[1]+s)),
                 max(0.0, min(1.0, rgb[2]+s)))
 
-    # drawing helpers
-    def tri_dev(a,b,c,idx):
-        glColor3f(*dbg_color(idx))
-        glVertex3f(*a); glVertex3f(*b); glVertex3f(*c)
-
-    def tri_std(a,b,c,idx,name3):
-        base = _panel_base(name3)
-        if name3 in WINDOWS or name3 in EXHAUST:
-            glColor3f(*base)  # flat
+    hull = []
+    for i,(a,b,c) in enumerate(faces):
+        if dev:
+            rgb = dbg_color(i)
+        elif (a,b,c) in WINDOWS or (a,b,c) in EXHAUST:
+            rgb = _panel_base((a,b,c))  # flat
         else:
-            glColor3f(*_jitter(name3, base))
-        glVertex3f(*a); glVertex3f(*b); glVertex3f(*c)
-
-    # flap primitives
-    def draw_flap_strip_tri(opposite, e0, e1, width_t, defl_deg):
-        """Create a thin quad strip along edge e0-e1 inside triangle (opposite,e0,e1),
-        hinged along the inner line at 'width_t' from the edge; rotate free edge about hinge."""
-        H0 = v_lerp(opposite, e0, width_t)
-        H1 = v_lerp(opposite, e1, width_t)
-        F0 = e0
-        F1 = e1
-        # Rotate free edge points about hinge axis
-        F0r = rotate_around_axis(F0, H0, H1, defl_deg)
-        F1r = rotate_around_axis(F1, H0, H1, defl_deg)
-        glBegin(GL_QUADS)
-        glColor3f(*FLAP_COLOR)
-        glVertex3f(*H0); glVertex3f(*H1); glVertex3f(*F1r); glVertex3f(*F0r)
-        glEnd()
+            rgb = _jitter((a,b,c), _panel_base((a,b,c)))
+        _mesh_add(hull, [(V[a], V[b], V[c])], rgb)
+    # V-tail quads (base surface), split like GL_QUADS
+    for j,(a,b,c,d) in enumerate(tail_quads):
+        rgb = dbg_color(len(faces)+j) if dev else (0.14,0.14,0.15)
+        _mesh_add(hull, [(V[a], V[b], V[c]), (V[a], V[c], V[d])], rgb)
+    baked = {'hull': _mesh_upload(np.array(hull, dtype=np.float32)), 'ink': None}
+
+    if not dev:
+        # --- Edge ink overlay for clarity (each shared edge once) ---
+        ink = []
+        drawn = set()
+        edges = [e for a,b,c in faces for e in [(a,b),(b,c),(c,a)]]
+        edges += [e for a,b,c,d in tail_quads for e in [(a,b),(b,c),(c,d),(d,a)]]
+        for e in edges:
+            key = tuple(sorted(e))
+            if key in drawn: continue
+            drawn.add(key)
+            for v in (V[e[0]], V[e[1]]):
+                ink.append((v[0], v[1], v[2], 0.03, 0.03, 0.04))
+        baked['ink'] = _mesh_upload(np.array(ink, dtype=np.float32), GL_LINES)
+    return baked
+
+# flap primitives (free-edge quads H0, H1, F1r, F0r)
+def _flap_strip_tri(opposite, e0, e1, width_t, defl_deg):
+    """Thin quad strip along edge e0-e1 inside triangle (opposite,e0,e1),
+    hinged along the inner line at 'width_t' from the edge; rotate free edge about hinge."""
+    H0 = v_lerp(opposite, e0, width_t)
+    H1 = v_lerp(opposite, e1, width_t)
+    # Rotate free edge points about hinge axis
+    F0r = rotate_around_axis(e0, H0, H1, defl_deg)
+    F1r = rotate_around_axis(e1, H0, H1, defl_deg)
+    return (H0, H1, F1r, F0r)
+
+def _flap_strip_quad(q0,q1,q2,q3, width_t, defl_deg):
+    """Quad with order (q0,q1,q2,q3). We form a strip near the trailing edge q3-q2 (parallel).
+    Hinge line at width_t from q3-q2 toward q0-q1."""
+    # interpolate along the two side edges toward trailing edge
+    H0 = v_lerp(q0, q3, width_t)
+    H1 = v_lerp(q1, q2, width_t)
+    F0r = rotate_around_axis(q3, H0, H1, defl_deg)
+    F1r = rotate_around_axis(q2, H0, H1, defl_deg)
+    # offset along quad normal
+    n = tri_normal(q0, q1, q2)
+    eps = 0.6
+    return tuple(offset_point_along_normal(p, n, eps) for p in (H0, H1, F1r, F0r))
+
+def _f117_flap_rows(elevonL_deg, elevonR_deg, rudder_deg_vis):
+    """GL_QUADS rows for the four elevon strips and two rudder strips; cached on the deflections."""
+    key = (elevonL_deg, elevonR_deg, rudder_deg_vis)
+    if _f117_flaps['key'] == key: return _f117_flaps['rows']
+    V = _f117_geometry()['V']
+    quads = []
+    # --- Wing elevons ---
+    width_t = 0.93  # how close to trailing edge (slim)
+    # left wing triangle: ("WRL","EOL","TIL") -> trailing edge = (EOL,TIL); opposite = WRL
+    opp = V["WRL"]; e_out = V["EOL"]; e_in = V["TIL"]
+    # split into outboard and inboard halves along the hinge
+    mid = v_lerp(e_out, e_in, 0.5)
+    # Outboard strip (EOL to mid)
+    quads.append(_flap_strip_tri(opp, e_out, mid, width_t, defl_deg = clamp(elevonL_deg*0.6 + (+elevonL_deg - elevonR_deg)*0.5, -ELV_MAX, ELV_MAX)))
+    # Inboard strip (mid to TIL)
+    quads.append(_flap_strip_tri(opp, mid, e_in, width_t, defl_deg = clamp(elevonL_deg*1.0 + (+elevonL_deg - elevonR_deg)*0.2, -ELV_MAX, ELV_MAX)))
+
+    # right wing triangle: ("WRR","TIR","EOR") -> trailing edge = (TIR,EOR); opposite = WRR
+    opp = V["WRR"]; e_in = V["TIR"]; e_out = V["EOR"]
+    mid = v_lerp(e_in, e_out, 0.5)
+    # Inboard strip (TIR to mid)
+    quads.append(_flap_strip_tri(opp, e_in, mid, width_t, defl_deg = clamp(elevonR_deg*1.0 + (elevonR_deg - elevonL_deg)*0.2, -ELV_MAX, ELV_MAX)))
+    # Outboard strip (mid to EOR)
+    quads.append(_flap_strip_tri(opp, mid, e_out, width_t, defl_deg = clamp(elevonR_deg*0.6 + (elevonR_deg - elevonL_deg)*0.5, -ELV_MAX, ELV_MAX)))
+
+    # --- Tail rudders (one slim strip on each V-tail trailing edge) ---
+    width_t_tail = 0.86
+    # Left tail quad order: ("VT_L0","VT_L1","VT_L2","VT_L3")  -> trailing edge q3-q2
+    quads.append(_flap_strip_quad(V["VT_L0"],V["VT_L1"],V["VT_L2"],V["VT_L3"], width_t_tail, defl_deg = +rudder_deg_vis))
+    # Right tail
+    quads.append(_flap_strip_quad(V["VT_R0"],V["VT_R1"],V["VT_R2"],V["VT_R3"], width_t_tail, defl_deg = -rudder_deg_vis))
+
+    c = F117_FLAP_COLOR
+    rows = np.array([(v[0], v[1], v[2], c[0], c[1], c[2]) for q in quads for v in q], dtype=np.float32)
+    _f117_flaps.update(key=key, rows=rows)
+    return rows
 
-    def draw_flap_strip_quad(q0,q1,q2,q3, width_t, defl_deg):
-        """Quad with order (q0,q1,q2,q3). We form a strip near the trailing edge q3-q2 (parallel).
-        Hinge line at width_t from q3-q2 toward q0-q1."""
-        # interpolate along the two side edges toward trailing edge
-        H0 = v_lerp(q0, q3, width_t)
-        H1 = v_lerp(q1, q2, width_t)
-        F0 = q3; F1 = q2  # trailing edge
-        F0r = rotate_around_axis(F0, H0, H1, defl_deg)
-        F1r = rotate_around_axis(F1, H0, H1, defl_deg)
-        # offset along quad normal
-        n = tri_normal(q0, q1, q2)
-        eps = 0.6
-        H0 = offset_point_along_normal(H0, n, eps)
-        H1 = offset_point_along_normal(H1, n, eps)
-        F0r = offset_point_along_normal(F0r, n, eps)
-        F1r = offset_point_along_normal(F1r, n, eps)
-        glBegin(GL_QUADS)
-        glColor3f(*FLAP_COLOR)
-        glVertex3f(*H0); glVertex3f(*H1); glVertex3f(*F1r); glVertex3f(*F0r)
-        glEnd()
+def draw_f117(elevonL_deg=0.0, elevonR_deg=0.0, rudder_deg_vis=0.0):
+    baked = _f117_gpu.get(bool(dev_colors))
+    if baked is None:
+        baked = _f117_gpu[bool(dev_colors)] = _f117_bake(bool(dev_colors))
 
     # --- draw hull ---
     glPushMatrix()
@@ -2659,75 +3795,22 @@ def draw_f117(elevonL_deg=0.0, elevonR_deg=0.0, rudder_deg_vis=0.0):
     glTranslatef(pos[0], pos[1], pos[2])
     glRotatef(yaw_deg,0,0,1); glRotatef(-pitch_deg,0,1,0); glRotatef(roll_deg,1,0,0)
 
-    glBegin(GL_TRIANGLES)
-    for i,(a,b,c) in enumerate(faces):
-        if dev_colors: tri_dev(V[a],V[b],V[c],i)
-        else:          tri_std(V[a],V[b],V[c],i,(a,b,c))
-    glEnd()
-
-    # V-tail quads (base surface)
-    glBegin(GL_QUADS)
-    base_idx = len(faces)
-    for j,(a,b,c,d) in enumerate(tail_quads):
-        if dev_colors:
-            glColor3f(*dbg_color(base_idx+j))
-        else:
-            glColor3f(0.14,0.14,0.15)
-        glVertex3f(*V[a]); glVertex3f(*V[b]); glVertex3f(*V[c]); glVertex3f(*V[d])
-    glEnd()
+    _mesh_draw(baked['hull'])
 
     # ---------------- Flaps (ambient, slim, grey-white) ----------------
     if not dev_colors:
         glEnable(GL_POLYGON_OFFSET_FILL)
         glPolygonOffset(-2.0, -2.0)
-        # --- Wing elevons ---
-        width_t = 0.93  # how close to trailing edge (slim)
-        # left wing triangle: ("WRL","EOL","TIL") -> trailing edge = (EOL,TIL); opposite = WRL
-        opp = V["WRL"]; e_out = V["EOL"]; e_in = V["TIL"]
-        # split into outboard and inboard halves along the hinge
-        mid = v_lerp(e_out, e_in, 0.5)
-        # Outboard strip (EOL to mid)
-        draw_flap_strip_tri(opp, e_out, mid, width_t, defl_deg = clamp(elevonL_deg*0.6 + (+elevonL_deg - elevonR_deg)*0.5, -ELV_MAX, ELV_MAX))
-        # Inboard strip (mid to TIL)
-        draw_flap_strip_tri(opp, mid, e_in, width_t, defl_deg = clamp(elevonL_deg*1.0 + (+elevonL_deg - elevonR_deg)*0.2, -ELV_MAX, ELV_MAX))
-
-        # right wing triangle: ("WRR","TIR","EOR") -> trailing edge = (TIR,EOR); opposite = WRR
-        opp = V["WRR"]; e_in = V["TIR"]; e_out = V["EOR"]
-        mid = v_lerp(e_in, e_out, 0.5)
-        # Inboard strip (TIR to mid)
-        draw_flap_strip_tri(opp, e_in, mid, width_t, defl_deg = clamp(elevonR_deg*1.0 + (elevonR_deg - elevonL_deg)*0.2, -ELV_MAX, ELV_MAX))
-        # Outboard strip (mid to EOR)
-        draw_flap_strip_tri(opp, mid, e_out, width_t, defl_deg = clamp(elevonR_deg*0.6 + (elevonR_deg - elevonL_deg)*0.5, -ELV_MAX, ELV_MAX))
-
-        glEnable(GL_POLYGON_OFFSET_FILL)
-        glPolygonOffset(-2.0, -2.0)
-        # --- Tail rudders (one slim strip on each V-tail trailing edge) ---
-        width_t_tail = 0.86
-        # Left tail quad order: ("VT_L0","VT_L1","VT_L2","VT_L3")  -> trailing edge q3-q2
-        draw_flap_strip_quad(V["VT_L0"],V["VT_L1"],V["VT_L2"],V["VT_L3"], width_t_tail, defl_deg = +rudder_deg_vis)
-        # Right tail
-        draw_flap_strip_quad(V["VT_R0"],V["VT_R1"],V["VT_R2"],V["VT_R3"], width_t_tail, defl_deg = -rudder_deg_vis)
-
+        rows = _f117_flap_rows(elevonL_deg, elevonR_deg, rudder_deg_vis)
+        _mesh_pointers(rows)
+        glDrawArrays(GL_QUADS, 0, len(rows))
+        glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
         glDisable(GL_POLYGON_OFFSET_FILL)
+
         # --- Edge ink overlay for clarity ---
         glEnable(GL_POLYGON_OFFSET_LINE); glPolygonOffset(-1.0, -1.0)
-        glLineWidth(1.2); glColor3f(0.03,0.03,0.04)
-        glBegin(GL_LINES)
-        drawn=set()
-        for a,b,c in faces:
-            for e in [(a,b),(b,c),(c,a)]:
-                key=tuple(sorted(e))
-                if key in drawn: continue
-                drawn.add(key)
-                va,vb = V[e[0]], V[e[1]]
-                glVertex3f(*va); glVertex3f(*vb)
-        for a,b,c,d in tail_quads:
-            for e in [(a,b),(b,c),(c,d),(d,a)]:
-                key=tuple(sorted(e))
-                if key in drawn: continue
-                drawn.add(key); va,vb=V[e[0]],V[e[1]]
-                glVertex3f(*va); glVertex3f(*vb)
-        glEnd()
+        glLineWidth(1.2)
+        _mesh_draw(baked['ink'])
         glDisable(GL_POLYGON_OFFSET_LINE)
 
     if was_cull: glEnable(GL_CULL_FACE)
@@ -2741,38 +3824,56 @@ def spawn_bullet():
              pos[1] + fy*nose_offset,
              pos[2] + fz*nose_offset]
     vel = [fx*BULLET_SPEED, fy*BULLET_SPEED, fz*BULLET_SPEED]
-    bullets.append({'p': start, 'v': vel, 't0': time.time()})
+    n = bullets['n']
+    if n == len(bullets['t0']):
+        for k in ('p', 'p0', 'v', 't0', 'alive'):
+            a = bullets[k]
+            bullets[k] = np.concatenate([a, np.zeros_like(a)])
+    bullets['p'][n] = start; bullets['p0'][n] = start; bullets['v'][n] = vel
+    bullets['t0'][n] = sim_time; bullets['alive'][n] = True
+    bullets['n'] = n + 1
+
+def live_bullets():
+    """Positions (k x 3 view/copy) of the rounds still in flight."""
+    n = bullets['n']
+    return bullets['p'][:n][bullets['alive'][:n]]
 
 def update_bullets(dt):
-    if not bullets: return
-    now = time.time()
-    keep = []
+    n = bullets['n']
+    if not n: return
+    P = bullets['p'][:n]; V = bullets['v'][:n]; alive = bullets['alive'][:n]
+
+    # integrate (keeping where each round started, for the swept hit tests)
+    P0 = bullets['p0'][:n]
+    P0[:] = P
+    P += V * dt
+
+    # ground collisions along this step's path (retire on first ground hit)
+    alive[_bullet_sweep_ground(P0, P - P0, np.flatnonzero(alive))] = False
+
+def retire_bullets():
+    """Lifetime/range/altitude cull, run after the ground and enemy sweeps so a
+       round's last segment is still tested; packs survivors to the front."""
+    n = bullets['n']
+    if not n: return
+    P = bullets['p'][:n]; alive = bullets['alive'][:n]
     limit = RADAR_RANGE * 1.1   # bullets vanish once beyond radar coverage
 
-    for b in bullets:
-        # integrate
-        b['p'][0] += b['v'][0]*dt
-        b['p'][1] += b['v'][1]*dt
-        b['p'][2] += b['v'][2]*dt
-
-        # lifetime
-        alive = (now - b['t0']) < BULLET_LIFE
-
-        # player-relative, circular cull (NOT origin-relative box)
-        dx = b['p'][0] - pos[0]
-        dy = b['p'][1] - pos[1]
-        dist2 = dx*dx + dy*dy
-        in_range = (dist2 <= (limit*limit)) and (0.0 < b['p'][2] < PLAYER_ALT_MAX + 1000.0)
-
-        # ground collisions
-        if _bullet_hit_any_ground(b):
-            b['t0'] = 0.0  # retire on first ground hit
-            continue
-
-        if alive and in_range:
-
-            keep.append(b)
-    bullets[:] = keep
+    # lifetime + player-relative, circular cull (NOT origin-relative box)
+    dx = P[:, 0] - pos[0]; dy = P[:, 1] - pos[1]
+    alive &= (sim_time - bullets['t0'][:n]) < BULLET_LIFE
+    alive &= (dx*dx + dy*dy) <= limit*limit
+    alive &= (P[:, 2] > 0.0) & (P[:, 2] < PLAYER_ALT_MAX + 1000.0)
+
+    # pack survivors to the front
+    k = int(alive.sum())
+    if k < n:
+        for key in ('p', 'p0', 'v', 't0'):
+            a = bullets[key]
+            a[:k] = a[:n][alive]
+        bullets['alive'][:n] = False
+        bullets['alive'][:k] = True
+        bullets['n'] = k
 
 # --- Player fire cadence ---
 def player_fire_update(dt, keys_down):
@@ -2811,7 +3912,7 @@ def update_lock(dt):
         allow = ['TAA','AA','SAM','BUNKER']
 
     # 1) cone-only candidates (range ignored to keep circle visible)
-    cands = _front_cone_candidates_any(cone_deg=cone, max_range=None, allow=allow)
+    cands = _front_cone_candidates_any(cone_deg=cone, max_range=None, allow=allow, limit=1)
     if not cands:
         _target_id, _lock_timer, _lock_state = None, 0.0, 'NONE'
         return
@@ -2948,7 +4049,7 @@ def update(dt):
 
 
 
-    player_fire_update(dt, keys_down); update_bullets(dt); update_enemies(dt)
+    player_fire_update(dt, keys_down); update_bullets(dt); update_enemies(dt); retire_bullets()
 
 
 
@@ -2961,6 +4062,7 @@ def update(dt):
     update_lock(dt)
     update_missiles(dt)  # update missiles after lock logic
 
+    update_ground_los()
     update_ground_weapons(dt)
     update_sams(dt)
 
@@ -2988,9 +4090,12 @@ def update(dt):
 # ---------------- HUD/Camera ----------------
 def draw_bullets():
     glDisable(GL_LIGHTING); glColor3f(1.0, 0.95, 0.25); glPointSize(6.0)
-    glBegin(GL_POINTS)
-    for b in bullets: glVertex3f(*b['p'])
-    glEnd()
+    pts = np.ascontiguousarray(live_bullets(), dtype=np.float32)
+    if not len(pts): return
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, pts)
+    glDrawArrays(GL_POINTS, 0, len(pts))
+    glDisableClientState(GL_VERTEX_ARRAY)
 
 
 
@@ -3132,10 +4237,15 @@ def draw_radar():
 
     # ---------------- Dots / rings ----------------
 
+    # only what's inside the radar disc, straight from the spatial grids
+    on_radar = {'TAA': [], 'AA': [], 'SAM': [], 'BUNKER': []}
+    for u in grid_query_radius(ground_grid, pos[0], pos[1], RADAR_RANGE):
+        on_radar[u['class']].append(u)
+
     # enemies (aircraft): red dots
     glPointSize(ENEMY_DOT_SIZE)
     glBegin(GL_POINTS)
-    for e in enemies:
+    for e in grid_query_radius(air_grid, pos[0], pos[1], RADAR_RANGE):
         dx=e['p'][0]-pos[0]; dy=e['p'][1]-pos[1]
         if math.hypot(dx,dy) > RADAR_RANGE: 
             continue
@@ -3174,7 +4284,7 @@ def draw_radar():
         glEnd()
 
     # scattered AA: light-red cross + small red circle = its effective bullet reach
-    for u in aa_units:
+    for u in on_radar['AA']:
         px,py=_to_radar(u['p'][0],u['p'][1])
         if (px-cx)**2+(py-cy)**2 > (half-2.0)**2: 
             continue
@@ -3198,7 +4308,7 @@ def draw_radar():
     #  - Yellow = inactive / reloading / not aiming
     #  - Red    = aiming AND loaded (hot)
     # Ring is clamped to radar edge and only drawn if the SAM itself is on radar.
-    for u in sam_units:
+    for u in on_radar['SAM']:
         px,py=_to_radar(u['p'][0],u['p'][1])
         if (px-cx)**2+(py-cy)**2 > (half-2.0)**2: 
             continue
@@ -3220,7 +4330,7 @@ def draw_radar():
         glEnd()
 
     # bunkers: black square + small black hint circle (their local AA umbrella)
-    for b in bunkers:
+    for b in on_radar['BUNKER']:
         px,py=_to_radar(b['p'][0],b['p'][1])
         if (px-cx)**2+(py-cy)**2 > (half-2.0)**2: 
             continue
@@ -3490,9 +4600,9 @@ def _los_blocked_by_towers(a, b, pad=0.0, steps=64):
                     return True
     return False
 
-def has_line_of_sight_all(a, b, clearance=30.0):
+def has_line_of_sight_all(a, b, clearance=30.0, key=None):
     """LOS that combines terrain and tower occlusion."""
-    if not has_line_of_sight(a, b, clearance=clearance):
+    if not has_line_of_sight(a, b, clearance=clearance, key=key):
         return False
     if _los_blocked_by_towers(a, b, pad=clearance*0.3):
         return False
@@ -3512,7 +4622,7 @@ def draw_target_highlight_and_stats():
  
    
     allow = ['AIR', 'TAA', 'AA', 'SAM', 'BUNKER']
-    cands = _front_cone_candidates_any(cone_deg=AIM_CONE_DEG, max_range=None, allow=allow)
+    cands = _front_cone_candidates_any(cone_deg=AIM_CONE_DEG, max_range=None, allow=allow, limit=1)
     if not cands:
         return
 
@@ -3523,7 +4633,7 @@ def draw_target_highlight_and_stats():
         return
 
     # Terrain + tower LOS
-    if not has_line_of_sight_all([pos[0], pos[1], pos[2]], world_p, clearance=30.0):
+    if not has_line_of_sight_all([pos[0], pos[1], pos[2]], world_p, clearance=30.0, key=tid):
         return
 
     scr = _project_to_screen(world_p[0], world_p[1], world_p[2])
@@ -3613,7 +4723,7 @@ def draw_lock_hud():
     # No target or blocked LOS => just center cone
     if not tgt_pos:
         _draw_center_cone(); return
-    if not has_line_of_sight_all([pos[0],pos[1],pos[2]], tgt_pos, clearance=30.0):
+    if not has_line_of_sight_all([pos[0],pos[1],pos[2]], tgt_pos, clearance=30.0, key=_target_id):
         _draw_center_cone(); return
 
     scr = _project_to_screen(tgt_pos[0], tgt_pos[1], tgt_pos[2])
@@ -3872,30 +4982,10 @@ def _screen_center_target(cone_deg=None):
     if not enemies: 
         return None, None
     deg = AIM_CONE_DEG if (cone_deg is None) else cone_deg
-    dot_min = math.cos(math.radians(deg))
-
-    (fx,fy,fz), _, _ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
-    best, best_err = None, 1e9
-    cx, cy = WIN_W*0.5, WIN_H*0.5
-    eye = [pos[0], pos[1], pos[2]]
-
-    for e in enemies:
-        vx = e['p'][0]-pos[0]; vy = e['p'][1]-pos[1]; vz = e['p'][2]-pos[2]
-        L  = math.sqrt(vx*vx + vy*vy + vz*vz) + 1e-9
-        dp = (fx*vx + fy*vy + fz*vz) / L
-        if dp < dot_min:
-            continue
-        # LOS gate
-        if not has_line_of_sight(eye, e['p'], clearance=30.0):
-            continue
-        scr = _project_to_screen(e['p'][0], e['p'][1], e['p'][2])
-        if not scr:
-            continue
-        sx, sy = scr
-        err = (sx-cx)*(sx-cx) + (sy-cy)*(sy-cy)
-        if err < best_err:
-            best, best_err = e, err
-    return best, best_err
+    cands = _front_cone_candidates(deg, limit=1)
+    if not cands:
+        return None, 1e9
+    return cands[0]
 
 
 
@@ -3937,18 +5027,9 @@ def draw_global_pointers():
     if cam_mode != 'third' or not GLOBAL_POINTERS: 
         return
     _hud_begin()
+    pins = []
     def draw_pin(world_p, color=(1,0,0), label=""):
-        scr = _project_to_screen(world_p[0], world_p[1], world_p[2]+30.0)
-        if not scr: return
-        sx, sy = scr
-        dist = math.hypot(world_p[0]-pos[0], world_p[1]-pos[1])
-        s = 12.0 if dist >= VISUAL_RANGE else max(6.0, 12.0 * (dist / float(VISUAL_RANGE)))
-        glColor3f(*color)
-        glBegin(GL_LINES)
-        glVertex2f(sx, sy); glVertex2f(sx, sy+s)
-        glVertex2f(sx - s*0.6, sy + s); glVertex2f(sx + s*0.6, sy + s)
-        glEnd()
-        if label: draw_screen_text(sx + 8, sy + s + 2, label, color=(0,0,0))
+        pins.append((world_p[0], world_p[1], world_p[2], color, label))
 
     for e in enemies:
         draw_pin(e['p'], color=(1.0,0.2,0.2), label=e.get('name',""))
@@ -3961,6 +5042,21 @@ def draw_global_pointers():
         draw_pin([u['p'][0],u['p'][1],u['z']], color=(0.7,0.2,1.0), label="SAM")
     for b in bunkers:
         draw_pin([b['p'][0],b['p'][1],b['z']], color=(0.1,0.1,0.1), label="Bunker")
+
+    # one batched projection for every pin, then draw the visible ones
+    if pins:
+        SX, SY, OK = project_many([(x, y, z + 30.0) for x, y, z, _, _ in pins])
+        for i in np.flatnonzero(OK):
+            x, y, _, color, label = pins[i]
+            sx, sy = float(SX[i]), float(SY[i])
+            dist = math.hypot(x-pos[0], y-pos[1])
+            s = 12.0 if dist >= VISUAL_RANGE else max(6.0, 12.0 * (dist / float(VISUAL_RANGE)))
+            glColor3f(*color)
+            glBegin(GL_LINES)
+            glVertex2f(sx, sy); glVertex2f(sx, sy+s)
+            glVertex2f(sx - s*0.6, sy + s); glVertex2f(sx + s*0.6, sy + s)
+            glEnd()
+            if label: draw_screen_text(sx + 8, sy + s + 2, label, color=(0,0,0))
     _hud_end()
 
 
@@ -3989,11 +5085,9 @@ def draw_hud():
     glMatrixMode(GL_MODELVIEW);  glPushMatrix(); glLoadIdentity()
 
     # top-left status strip
-    glColor3f(1,1,1)
     camtxt = 'FP' if cam_mode=='first' else ('TP-LOCK' if cam_lock_follow else 'TP-Free')
     s = f"Score {score}   Speed {int(speed)}   Alt {int(pos[2])}   Cam {camtxt}   Y:{int(yaw_deg)} P:{int(pitch_deg)} R:{int(roll_deg)}"
-    glRasterPos2f(10, WIN_H-24)
-    for ch in s: glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(ch))
+    draw_screen_text(10, WIN_H-24, s, font=GLUT_BITMAP_HELVETICA_18, color=(1.0, 1.0, 1.0))
 
     # IMPORTANT: draw radar while still in HUD ortho
     draw_radar()
@@ -4025,29 +5119,119 @@ def draw_hud():
 
 
 
-def setup_camera():
-    glMatrixMode(GL_PROJECTION); glLoadIdentity()
+def camera_pose():
+    """(fov, eye, center) of the current view; setup_camera hands the same values to GL."""
     fov = FOV_Y_FIRST if cam_mode == 'first' else FOV_Y_THIRD
-    gluPerspective(fov, WIN_W/float(max(1, WIN_H)), NEAR_Z, FAR_Z)
-    glMatrixMode(GL_MODELVIEW); glLoadIdentity()
     (fx,fy,fz), _, _ = rotation_matrix(yaw_deg, pitch_deg, roll_deg)
 
     if cam_mode == 'first':
         # small offset forward + slight up for better sightline
         eye = [pos[0] + fx*10.0, pos[1] + fy*10.0, pos[2] + fz*10.0 + 2.0]
         ctr = [eye[0] + fx*120.0, eye[1] + fy*120.0, eye[2] + fz*120.0]
-        gluLookAt(eye[0],eye[1],eye[2], ctr[0],ctr[1],ctr[2], 0,0,1)
     else:
         if cam_lock_follow:
-            cx = pos[0] - fx*cam_dist; cy = pos[1] - fy*cam_dist; cz = pos[2] - fz*cam_dist + cam_height
-            ctr = [pos[0] + fx*100.0, pos[1] + fy*100.0, pos[2] + fz*100.0]
-            gluLookAt(cx,cy,cz, ctr[0],ctr[1],ctr[2], 0,0,1)
+            eye = [pos[0] - fx*cam_dist, pos[1] - fy*cam_dist, pos[2] - fz*cam_dist + cam_height]
         else:
             oy,op = deg2rad(orbit_yaw), deg2rad(orbit_pitch)
             ox = math.cos(oy)*math.cos(op); oyv = math.sin(oy)*math.cos(op); oz = math.sin(op)
-            cx = pos[0] - ox*cam_dist; cy = pos[1] - oyv*cam_dist; cz = pos[2] + oz*cam_dist + cam_height
-            ctr = [pos[0] + fx*100.0, pos[1] + fy*100.0, pos[2] + fz*100.0]
-            gluLookAt(cx,cy,cz, ctr[0],ctr[1],ctr[2], 0,0,1)
+            eye = [pos[0] - ox*cam_dist, pos[1] - oyv*cam_dist, pos[2] + oz*cam_dist + cam_height]
+        ctr = [pos[0] + fx*100.0, pos[1] + fy*100.0, pos[2] + fz*100.0]
+    return fov, eye, ctr
+
+def setup_camera():
+    view, proj = camera_update()
+    glMatrixMode(GL_PROJECTION); glLoadMatrixd(np.ascontiguousarray(proj.T))
+    glMatrixMode(GL_MODELVIEW);  glLoadMatrixd(np.ascontiguousarray(view.T))
+
+# CPU mirror of gluLookAt/gluPerspective (column-vector convention: clip = P @ V @ p)
+def _look_at_matrix(eye, ctr, up=(0.0, 0.0, 1.0)):
+    f = np.subtract(ctr, eye, dtype=float); f /= np.linalg.norm(f) + 1e-12
+    s = np.cross(f, up); s /= np.linalg.norm(s) + 1e-12
+    u = np.cross(s, f)
+    m = np.identity(4)
+    m[0, :3] = s; m[1, :3] = u; m[2, :3] = -f
+    m[:3, 3] = -m[:3, :3] @ np.asarray(eye, dtype=float)
+    return m
+
+def _perspective_matrix(fov_deg, aspect, n, f):
+    c = 1.0 / math.tan(math.radians(fov_deg) * 0.5)
+    m = np.zeros((4, 4))
+    m[0, 0] = c / aspect; m[1, 1] = c
+    m[2, 2] = (f + n) / (n - f); m[2, 3] = 2.0 * f * n / (n - f)
+    m[3, 2] = -1.0
+    return m
+
+# Camera of the latest frame. setup_camera refreshes it once per frame (sim_step does
+# in headless runs) and every screen projection reads it instead of querying GL.
+_cam = {'view': None, 'proj': None, 'pv': None, 'rows': None, 'vp': (0, 0, WIN_W, WIN_H),
+        'planes': None, 'planes_l': None, 'gen': 0}   # gen: bumped per camera_update (memo keys)
+
+def camera_update():
+    """Recompute and cache the view/projection matrices; returns (view, proj)."""
+    fov, eye, ctr = camera_pose()
+    view = _look_at_matrix(eye, ctr)
+    proj = _perspective_matrix(fov, WIN_W/float(max(1, WIN_H)), NEAR_Z, FAR_Z)
+    _cam['view'], _cam['proj'], _cam['pv'] = view, proj, proj @ view
+    _cam['rows'] = _cam['pv'].tolist()   # plain floats for the scalar path
+    _cam['gen'] += 1
+    _cam['vp'] = (0, 0, WIN_W, WIN_H)
+    _cam['planes'] = _frustum_planes(_cam['pv'])
+    _cam['planes_l'] = _cam['planes'].tolist()
+    return view, proj
+
+def project_many(P):
+    """Project an (n,3) array of world points to window coords with the cached camera.
+       Returns (sx, sy, ok); ok is False where _project_to_screen would give None."""
+    if _cam['pv'] is None: camera_update()
+    vx, vy, vw, vh = _cam['vp']
+    P = np.asarray(P, dtype=float).reshape(-1, 3)
+    c = P @ _cam['pv'][:, :3].T + _cam['pv'][:, 3]
+    w = c[:, 3]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv = 1.0 / w
+        wz = (c[:, 2] * inv + 1.0) * 0.5
+        sx = vx + (c[:, 0] * inv + 1.0) * 0.5 * vw
+        sy = vy + (c[:, 1] * inv + 1.0) * 0.5 * vh
+    ok = (w != 0.0) & (wz >= 0.0) & (wz <= 1.0)
+    return sx, sy, ok
+
+# --- Frustum culling ---
+# The six clip planes of the cached camera, so draw code can skip whatever is off
+# screen before it reaches GL. Tests are conservative: a False means surely invisible.
+FRUSTUM_CULL = True   # toggle with 'k'
+
+def _frustum_planes(pv):
+    # Gribb/Hartmann: left, right, bottom, top, near, far as (a,b,c,d), inside when >= 0
+    r = pv
+    P = np.array([r[3] + r[0], r[3] - r[0], r[3] + r[1], r[3] - r[1], r[3] + r[2], r[3] - r[2]])
+    return P / np.linalg.norm(P[:, :3], axis=1)[:, None]
+
+def frustum_sphere(x, y, z, r):
+    """False only if the sphere lies entirely outside the camera frustum."""
+    if not FRUSTUM_CULL: return True
+    if _cam['pv'] is None: camera_update()
+    for a, b, c, d in _cam['planes_l']:
+        if a*x + b*y + c*z + d < -r: return False
+    return True
+
+def frustum_spheres(P, r):
+    """Vectorized frustum_sphere: (n,3) centres, scalar or (n,) radii -> bool mask."""
+    P = np.asarray(P, dtype=float).reshape(-1, 3)
+    if not FRUSTUM_CULL: return np.ones(len(P), dtype=bool)
+    if _cam['pv'] is None: camera_update()
+    pl = _cam['planes']
+    d = P @ pl[:, :3].T + pl[:, 3]
+    return (d >= -np.reshape(r, (-1, 1))).all(axis=1)
+
+def frustum_aabb(x0, y0, z0, x1, y1, z1):
+    """False only if the axis-aligned box lies entirely outside the camera frustum."""
+    if not FRUSTUM_CULL: return True
+    if _cam['pv'] is None: camera_update()
+    for a, b, c, d in _cam['planes_l']:
+        # the box corner farthest along the plane normal
+        if (a*(x1 if a > 0 else x0) + b*(y1 if b > 0 else y0) + c*(z1 if c > 0 else z0) + d) < 0.0:
+            return False
+    return True
 
 
 
@@ -4079,14 +5263,152 @@ def _steer_towards(e, target_xy, rate_deg_per_s, dt):
     e['yaw'] += diff
 
 def _project_to_screen(x, y, z):
-    mv  = glGetDoublev(GL_MODELVIEW_MATRIX)
-    pj  = glGetDoublev(GL_PROJECTION_MATRIX)
-    vp  = glGetIntegerv(GL_VIEWPORT)
-    wx, wy, wz = gluProject(x, y, z, mv, pj, vp)
+    if _cam['pv'] is None: camera_update()
+    m0, m1, m2, m3 = _cam['rows']; vx, vy, vw, vh = _cam['vp']
+    w = m3[0]*x + m3[1]*y + m3[2]*z + m3[3]
+    if w == 0.0: return None
+    wz = ((m2[0]*x + m2[1]*y + m2[2]*z + m2[3]) / w + 1.0) * 0.5
     if wz < 0.0 or wz > 1.0: return None
-    return wx, wy
+    return (vx + ((m0[0]*x + m0[1]*y + m0[2]*z + m0[3]) / w + 1.0) * 0.5 * vw,
+            vy + ((m1[0]*x + m1[1]*y + m1[2]*z + m1[3]) / w + 1.0) * 0.5 * vh)
+
+# --- Text: glyph atlas ---
+# draw_screen_text only queues; text_flush() draws every string of the frame as textured
+# quads in one glDrawArrays. The glyphs are the same GLUT bitmap fonts, rasterized once
+# into a texture, and string layouts are cached by (font, text).
+TEXT_ATLAS = True          # False -> glutBitmapCharacter per character (cleared in init_gl without FBOs)
+TEXT_LAYOUT_CACHE = 512    # laid-out strings kept between frames
+TEXT_GLYPHS = range(32, 127)
+TEXT_PAD = 4               # texels around each glyph's raster position inside its cell
+_text_atlas = {'tex': None, 'size': (0, 0), 'cols': 16, 'fonts': {}}   # fonts: _font_key -> {'font', 'adv', 'cell', 'org', 'base', 'ink'}
+_text_layout = OrderedDict()   # (font, text) -> float32 (6 per inked glyph, 4) x,y,u,v from the pen origin
+_text_queue = []               # (x0, y0, layout, rgb) for this frame
+
+def _text_fonts():
+    return (GLUT_BITMAP_HELVETICA_12, GLUT_BITMAP_HELVETICA_18)
+
+def _font_key(font):
+    # PyOpenGL hands out GLUT fonts as (unhashable) c_void_p on some platforms
+    return getattr(font, 'value', font)
+
+def text_atlas_bake():
+    """Rasterize the HUD fonts into one RGBA texture through an FBO (needs a GL context and glutInit)."""
+    if _text_atlas['tex'] is not None: return
+    fonts, cols, W, y = {}, _text_atlas['cols'], 512, 0
+    for font in _text_fonts():
+        h = glutBitmapHeight(font)
+        adv = {c: glutBitmapWidth(font, c) for c in TEXT_GLYPHS}
+        cw, ch = max(adv.values()) + 2*TEXT_PAD, 2*h     # baseline at h//2 leaves room for descenders
+        fonts[_font_key(font)] = {'font': font, 'adv': adv, 'cell': (cw, ch), 'org': (0, y), 'base': h // 2}
+        y += ch * -(-len(TEXT_GLYPHS) // cols)
+    H = 1 << max(6, (y - 1).bit_length())
+
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, W, H, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex, 0)
+
+    vp, clear_rgba = glGetIntegerv(GL_VIEWPORT), glGetFloatv(GL_COLOR_CLEAR_VALUE)
+    was_depth = glIsEnabled(GL_DEPTH_TEST)
+    glViewport(0, 0, W, H)
+    glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, W, 0, H)
+    glMatrixMode(GL_MODELVIEW);  glPushMatrix(); glLoadIdentity()
+    glDisable(GL_DEPTH_TEST)
+    glClearColor(0.0, 0.0, 0.0, 0.0); glClear(GL_COLOR_BUFFER_BIT)
+    glColor4f(1.0, 1.0, 1.0, 1.0)   # glyph texels: white, alpha = coverage
+    for f in fonts.values():
+        (cw, ch), (ox, oy) = f['cell'], f['org']
+        for k, c in enumerate(TEXT_GLYPHS):
+            glRasterPos2i(ox + (k % cols)*cw + TEXT_PAD, oy + (k // cols)*ch + f['base'])
+            glutBitmapCharacter(f['font'], c)
+    # inked texel box per glyph, so quads only cover what a glyph actually sets
+    A = np.frombuffer(glReadPixels(0, 0, W, H, GL_ALPHA, GL_UNSIGNED_BYTE), dtype=np.uint8).reshape(H, W)
+    for f in fonts.values():
+        (cw, ch), (ox, oy) = f['cell'], f['org']
+        f['ink'] = {}
+        for k, c in enumerate(TEXT_GLYPHS):
+            u, v = ox + (k % cols)*cw, oy + (k // cols)*ch
+            ys, xs = np.nonzero(A[v:v+ch, u:u+cw])
+            f['ink'][c] = (u, v, xs.min(), ys.min(), xs.max() + 1, ys.max() + 1) if len(xs) else None
+    glMatrixMode(GL_PROJECTION); glPopMatrix()
+    glMatrixMode(GL_MODELVIEW);  glPopMatrix()
+    if was_depth: glEnable(GL_DEPTH_TEST)
+    glViewport(*vp); glClearColor(*clear_rgba)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    glDeleteFramebuffers(1, [fbo])
+    _text_atlas.update(tex=tex, size=(W, H), fonts=fonts)
+
+def _text_layout_of(fk, text):
+    """Quads for `text` relative to the (integer) raster position, cached per string."""
+    key = (fk, text)
+    q = _text_layout.get(key)
+    if q is not None:
+        _text_layout.move_to_end(key); return q
+    f = _text_atlas['fonts'][fk]
+    W, H = _text_atlas['size']
+    rows, pen = [], 0
+    for c in text:
+        c = ord(c) if ord(c) in f['adv'] else ord('?')
+        ink = f['ink'][c]
+        if ink:
+            u, v, a0, b0, a1, b1 = ink
+            x0, y0 = pen - TEXT_PAD + a0, b0 - f['base']
+            x1, y1 = x0 + (a1 - a0), y0 + (b1 - b0)
+            u0, v0, u1, v1 = (u + a0)/W, (v + b0)/H, (u + a1)/W, (v + b1)/H
+            rows += [(x0, y0, u0, v0), (x1, y0, u1, v0), (x1, y1, u1, v1),
+                     (x0, y0, u0, v0), (x1, y1, u1, v1), (x0, y1, u0, v1)]
+        pen += f['adv'][c]
+    q = np.array(rows, dtype=np.float32).reshape(-1, 4)
+    _text_layout[key] = q
+    if len(_text_layout) > TEXT_LAYOUT_CACHE: _text_layout.popitem(last=False)
+    return q
+
+def draw_screen_text(x, y, text, font=None, color=(0.95, 0.95, 1.0)):
+    """Window-space text at (x, y) (baseline start, like glRasterPos2f). Queued for text_flush()."""
+    if font is None: font = GLUT_BITMAP_HELVETICA_12
+    if TEXT_ATLAS and _text_atlas['tex'] is None: text_atlas_bake()
+    fk = _font_key(font)
+    if not TEXT_ATLAS or fk not in _text_atlas['fonts']:
+        _draw_screen_text_glut(x, y, text, font, color); return
+    # snap to whole pixels like glBitmap's raster position so quads land on whole texels
+    _text_queue.append((math.floor(x), math.floor(y), _text_layout_of(fk, text), color))
+
+def text_flush():
+    """Draw all text queued this frame: one vertex array, one draw call, on top of everything."""
+    if not _text_queue: return
+    n = sum(len(q) for _, _, q, _ in _text_queue)
+    V = np.empty((n, 7), dtype=np.float32)   # x, y, u, v, r, g, b
+    i = 0
+    for x0, y0, q, rgb in _text_queue:
+        m = len(q)
+        V[i:i+m, :4] = q; V[i:i+m, 0] += x0; V[i:i+m, 1] += y0; V[i:i+m, 4:] = rgb
+        i += m
+    _text_queue.clear()
+
+    _hud_begin()
+    glEnable(GL_TEXTURE_2D); glBindTexture(GL_TEXTURE_2D, _text_atlas['tex'])
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+    glEnable(GL_BLEND); glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 7*4, ctypes.c_void_p(V.ctypes.data))
+    glTexCoordPointer(2, GL_FLOAT, 7*4, ctypes.c_void_p(V.ctypes.data + 8))
+    glColorPointer(3, GL_FLOAT, 7*4, ctypes.c_void_p(V.ctypes.data + 16))
+    glDrawArrays(GL_TRIANGLES, 0, n)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_TEXTURE_COORD_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+    glDisable(GL_BLEND)
+    glBindTexture(GL_TEXTURE_2D, 0); glDisable(GL_TEXTURE_2D)
+    _hud_end()
 
-def draw_screen_text(x, y, text, font=GLUT_BITMAP_HELVETICA_12, color=(0.95, 0.95, 1.0)):
+def _draw_screen_text_glut(x, y, text, font, color):
+    # fallback: one glutBitmapCharacter per character, drawn immediately
+    was_depth = glIsEnabled(GL_DEPTH_TEST)
     glDisable(GL_DEPTH_TEST)
     glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity(); gluOrtho2D(0, WIN_W, 0, WIN_H)
     glMatrixMode(GL_MODELVIEW);  glPushMatrix(); glLoadIdentity()
@@ -4095,25 +5417,116 @@ def draw_screen_text(x, y, text, font=GLUT_BITMAP_HELVETICA_12, color=(0.95, 0.9
     for ch in text:
         glutBitmapCharacter(font, ord(ch))
     glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix(); glMatrixMode(GL_MODELVIEW)
-    glEnable(GL_DEPTH_TEST)
+    if was_depth: glEnable(GL_DEPTH_TEST)
 
 def _draw_name_label(e):
-    # draw simple 3D world-space label just above the plane
-    glDisable(GL_LIGHTING)
-    glColor3f(0.0, 0.0, 0.0)
-    glRasterPos3f(e['p'][0], e['p'][1], e['p'][2] + e['hit_r'] + 20.0)
-    text = e['name']
-    for ch in text:
-        glutBitmapCharacter(GLUT_BITMAP_HELVETICA_18, ord(ch))
+    # simple world-space label just above the plane
+    p = _project_to_screen(e['p'][0], e['p'][1], e['p'][2] + e['hit_r'] + 20.0)
+    if p: draw_screen_text(p[0], p[1], e['name'], font=GLUT_BITMAP_HELVETICA_18, color=(0.0, 0.0, 0.0))
+
+# ---------------- Fixed-step simulation ----------------
+# update() always advances by exactly 1/SIM_HZ; display() runs as many steps as
+# the elapsed wall time calls for and draws poses blended between the last two
+# steps, so a slow frame costs smoothness instead of game speed.
+# Gameplay timers (lifetimes, patterns, cooldowns) read sim_time, never the wall clock.
+SIM_HZ         = 60.0
+SIM_MAX_STEPS  = 5       # per frame; below SIM_HZ/SIM_MAX_STEPS fps the game slows rather than spirals
+SIM_SCALE      = 1.0     # game seconds per wall second
+SIM_PAUSED     = False   # toggle with 'o'
+PAUSE_KEYS     = {b't', b'c', b'p', b';'}   # camera/HUD keys still live while paused
+SIM_INTERP     = True    # blend rendered poses between sim steps
+SIM_SNAP_DIST  = 4.0 * SPEED_MAX / SIM_HZ   # larger per-step jumps (respawn) are drawn unblended
+
+sim_time  = 0.0         # game clock (s), advanced only by sim_step
+_sim_acc  = 0.0
+_sim_prev = None         # player pose at the start of the latest step
+_sim_live = None         # real state parked while an interpolated frame is drawn
+
+def _lerp_deg(a, b, t):
+    return a + (((b - a + 180.0) % 360.0) - 180.0) * t
+
+def _lerp_p(a, b, t):
+    if abs(b[0]-a[0]) + abs(b[1]-a[1]) + abs(b[2]-a[2]) > SIM_SNAP_DIST: return b
+    return [a[0] + (b[0]-a[0])*t, a[1] + (b[1]-a[1])*t, a[2] + (b[2]-a[2])*t]
+
+def sim_snapshot():
+    """Remember the poses interpolation blends from; called before each step."""
+    global _sim_prev
+    _sim_prev = (pos[:], yaw_deg, pitch_deg, roll_deg)
+    for e in enemies:
+        e['p_prev'] = e['p'][:]; e['yaw_prev'] = e['yaw']
+    for m in missiles:
+        m['pos_prev'] = m['pos'][:]
+
+def sim_step(dt):
+    global sim_time
+    sim_time += dt
+    if HEADLESS: camera_update()   # no setup_camera to refresh the projection cache
+    update(dt)
+
+def sim_advance(frame_dt):
+    """Run the fixed steps owed for frame_dt wall seconds; returns the blend factor in [0,1)."""
+    global _sim_acc
+    step = 1.0 / SIM_HZ
+    if SIM_PAUSED: return _sim_acc / step
+    _sim_acc = min(_sim_acc + max(frame_dt, 0.0) * SIM_SCALE, SIM_MAX_STEPS * step)
+    _los_frame['t_end'] = time.perf_counter() + LOS_BUDGET_US*1e-6; _los_frame['done'] = 0
+    try:
+        while _sim_acc >= step:
+            sim_snapshot()
+            sim_step(step)
+            _sim_acc -= step
+    finally:
+        _los_frame['t_end'] = None
+    return _sim_acc / step
+
+def sim_run(seconds):
+    """Advance the game by `seconds` of sim time as fast as the CPU allows (headless/tests)."""
+    step = 1.0 / SIM_HZ
+    for _ in range(int(round(seconds * SIM_HZ))):
+        sim_step(step)
+
+def interp_begin(alpha):
+    """Swap blended poses into the live state for drawing; interp_end() restores it."""
+    global _sim_live, yaw_deg, pitch_deg, roll_deg
+    if not SIM_INTERP or _sim_prev is None: return
+    _sim_live = (pos[:], yaw_deg, pitch_deg, roll_deg,
+                 [(e, e['p'], e['yaw']) for e in enemies],
+                 [(m, m['pos']) for m in missiles],
+                 bullets['p'])
+    p0, y0, pi0, r0 = _sim_prev
+    pos[:] = _lerp_p(p0, pos, alpha)
+    yaw_deg   = _lerp_deg(y0, yaw_deg, alpha)
+    pitch_deg = pi0 + (pitch_deg - pi0) * alpha
+    roll_deg  = r0 + (roll_deg - r0) * alpha
+    for e in enemies:
+        if 'p_prev' in e:
+            e['p'] = _lerp_p(e['p_prev'], e['p'], alpha)
+            e['yaw'] = _lerp_deg(e['yaw_prev'], e['yaw'], alpha)
+    for m in missiles:
+        if 'pos_prev' in m: m['pos'] = _lerp_p(m['pos_prev'], m['pos'], alpha)
+    n = bullets['n']
+    bp = bullets['p'].copy()
+    bp[:n] += (alpha - 1.0) * (bp[:n] - bullets['p0'][:n])
+    bullets['p'] = bp
+
+def interp_end():
+    global _sim_live, yaw_deg, pitch_deg, roll_deg
+    if _sim_live is None: return
+    p, yaw_deg, pitch_deg, roll_deg, es, ms, bullets['p'] = _sim_live
+    pos[:] = p
+    for e, ep, ey in es: e['p'] = ep; e['yaw'] = ey
+    for m, mp in ms: m['pos'] = mp
+    _sim_live = None
 
 # ---------------- GLUT ----------------
 def display():
     global last_time
     now = time.time()
     if last_time is None: last_time = now
-    dt = min(now - last_time, 1.0/60.0); last_time = now
+    alpha = sim_advance(now - last_time); last_time = now
 
-    update(dt)
+    interp_begin(alpha)
 
     glViewport(0, 0, WIN_W, WIN_H)
     glClearColor(0.53, 0.81, 0.92, 1.0)  # sky blue
@@ -4137,16 +5550,17 @@ def display():
 
     draw_enemies()
     draw_bullets()
-    draw_flares()
     draw_missiles()      # draw missiles in 3D before HUD
     draw_aa_shots()
 
-    draw_explosions()
+    draw_fx()            # flares, missile trails, explosions
 
     draw_dev_hitboxes()
 
 
     draw_hud()
+    text_flush()
+    interp_end()
 
     glutSwapBuffers()
     glutPostRedisplay()
@@ -4162,7 +5576,7 @@ def keyboard_down(key, x, y):
     if isinstance(key, bytes) and len(key)==1 and 65 <= key[0] <= 90: k = bytes([key[0]+32])
     else: k = key
     if k == b'\x1b': sys.exit(0)
-    keys_down.add(k)
+    if not SIM_PAUSED: keys_down.add(k)
 
     if k == b'h':
         globals()['SHOW_HITBOXES'] = not globals().get('SHOW_HITBOXES', False)
@@ -4170,9 +5584,21 @@ def keyboard_down(key, x, y):
 
 
     if k == b'\\': dev_colors = not dev_colors
+    if k == b'g':  # ground mode: LOD quadtree <-> fixed patch
+        globals()['GROUND_MODE'] = 'patch' if GROUND_MODE == 'lod' else 'lod'
+        return
     if k == b'l':  # god mode (invincible)
         globals()['PLAYER_INVINCIBLE'] = not globals().get('PLAYER_INVINCIBLE', False)
         return
+    if k == b'o':  # pause / resume the simulation
+        globals()['SIM_PAUSED'] = not SIM_PAUSED
+        return
+    if k == b'k':  # frustum culling on/off
+        globals()['FRUSTUM_CULL'] = not FRUSTUM_CULL
+        return
+
+    # paused: only the toggles above plus camera/HUD keys, no gameplay input
+    if SIM_PAUSED and k not in PAUSE_KEYS: return
 
     if k == b' ': spawn_bullet()
     if k == b't':
@@ -4221,10 +5647,9 @@ def keyboard_down(key, x, y):
 
     # Drop flare on Z (cooldown)
     if k in (b'z',):
-        now = time.time()
-        if now - last_flare_time >= FLARE_COOLDOWN:
+        if sim_time - last_flare_time >= FLARE_COOLDOWN:
             drop_flare()
-            globals()['last_flare_time'] = now
+            globals()['last_flare_time'] = sim_time
         return
 
 
@@ -4248,7 +5673,8 @@ def keyboard_up(key, x, y):
         lock_candidate = None
     
     if k == MSL_FIRE_KEY and globals().get('msl_armed'):
-        release_missile_trigger()
+        if SIM_PAUSED: globals()['msl_armed'] = False   # released while paused: disarm, don't fire
+        else: release_missile_trigger()
 
 
 def special_keys(key, x, y):
@@ -4268,9 +5694,10 @@ def mouse(button, state, x, y):
     # Right mouse behaves like X
     if button == GLUT_RIGHT_BUTTON:
         if state == GLUT_DOWN:
-            globals()['msl_armed'] = True
-        elif state == GLUT_UP:
-            release_missile_trigger()
+            if not SIM_PAUSED: globals()['msl_armed'] = True
+        elif state == GLUT_UP and msl_armed:
+            if SIM_PAUSED: globals()['msl_armed'] = False
+            else: release_missile_trigger()
 
 
 def init_gl():
@@ -4278,8 +5705,36 @@ def init_gl():
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_CULL_FACE); glCullFace(GL_BACK)
     glDisable(GL_LIGHTING)
+    if not bool(glGenBuffers):   # pre-1.5 GL: keep the immediate-mode ground
+        globals()['GROUND_RETAINED'] = False
+    if not bool(glGenFramebuffers):   # no FBOs to bake the glyph atlas: per-character text
+        globals()['TEXT_ATLAS'] = False
+
+# ---------------- Headless ----------------
+HEADLESS_SECONDS = 60.0   # default sim length; override with `--headless <seconds>`
+
+def run_headless(seconds=None):
+    """Build the world and run the full update() pipeline with no window; prints timing."""
+    if seconds is None:
+        seconds = HEADLESS_SECONDS
+        i = sys.argv.index('--headless') + 1 if '--headless' in sys.argv else len(sys.argv)
+        if i < len(sys.argv):
+            try: seconds = float(sys.argv[i])
+            except ValueError: pass
+    world_init()
+    spawn_bunker_cluster()
+    t0 = time.perf_counter()
+    sim_run(seconds)
+    wall = time.perf_counter() - t0
+    steps = int(round(seconds * SIM_HZ))
+    print(f"headless: {seconds:.1f}s sim in {wall:.2f}s wall "
+          f"({1e3*wall/max(1, steps):.2f} ms/step, {seconds/max(wall, 1e-9):.1f}x real time), "
+          f"score {score}, enemies {len(enemies)}")
 
 def main():
+    if HEADLESS:
+        run_headless()
+        return
     try: glutInit(sys.argv)
     except TypeError: glutInit()
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGBA | GLUT_DEPTH)
@@ -4292,9 +5747,14 @@ def main():
     glutSpecialFunc(special_keys)
     glutMouseFunc(mouse)
     init_gl()
+    enemy_meshes_bake()
+    ground_meshes_bake()
+    if TEXT_ATLAS: text_atlas_bake()
 
     world_init()
     spawn_bunker_cluster()
+    if GROUND_RETAINED:
+        ground_warmup()
 
     glutMainLoop()
 